@@ -2,6 +2,8 @@ from .core.ldict_ import Ldict as ldict
 from .empty import Empty
 from .parameter.functionspace import FunctionSpace
 from .parameter.let import lLet as let
+from .parameter.sweep import lSweep as sweep
+from .stepdecorator import step
 
 empty = Empty()
 """The empty object is used to induce a ldict from a dict"""
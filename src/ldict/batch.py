@@ -0,0 +1,222 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+"""Micro-batching: a single call of a batch-capable function for the pending values of many ldicts
+
+A step declares itself batch-capable with 'f.metadata["batch"]': True, a maximum batch size, or a dict
+{"size": maximum batch size (default 64), "window": seconds to wait for more calls (default 0)}.
+It is then always called with a list of values for each input field (one per ldict) and a single value for
+each parameter (calls with different parameter values are not batched together); it returns a dict with a
+sequence of values (list, array, ...) for each output field, e.g., '{"y": model.predict(numpy.stack(x))}'.
+A step with a single output (e.g., 'd["y"] = f') returns a single sequence.
+
+Lazy values evaluated concurrently (threads, 'Scheduler', 'Prefetcher') are batched as they wait for each
+other up to 'window' seconds; 'evaluate_batched' collects them instead, without waiting.
+"""
+from threading import Condition, Event
+from time import monotonic
+from weakref import WeakKeyDictionary
+
+from ldict.exception import BadOutput
+
+
+class MicroBatcher:
+    """Calls of a batch-capable function, queued until the batch is full or the window has passed
+
+    >>> from ldict import ldict
+    >>> from ldict.scheduler import Scheduler
+    >>> calls = []
+    >>> def predict(x, scale=2):
+    ...     calls.append(len(x))
+    ...     return {"y": [v * scale for v in x], "z": [-v for v in x]}
+    >>> predict.metadata = {"batch": {"size": 8, "window": 1}}
+    >>> ds = [ldict(x=i) >> predict for i in range(8)]
+    >>> Scheduler(workers=8).evaluate(ds, fields=["y"])
+    >>> [d.y for d in ds], [d.z for d in ds], calls
+    ([0, 2, 4, 6, 8, 10, 12, 14], [0, -1, -2, -3, -4, -5, -6, -7], [8])
+    """
+
+    batchers = WeakKeyDictionary()
+
+    def __init__(self, f, config):
+        from ldict.core.inspection import extract_input
+
+        self.f, self.config = f, config
+        if isinstance(config, dict):
+            self.size, self.window = config.get("size", 64), config.get("window", 0)
+        else:
+            self.size, self.window = 64 if config is True else config, 0
+        self.parameters = set(extract_input(f)[1])
+        self.cond, self.queues = Condition(), {}
+
+    @classmethod
+    def of(cls, f):
+        """Batcher of a function, if it is batch-capable ('metadata["batch"]')"""
+        from ldict.core.dag import step_metadata
+
+        if not (config := step_metadata(f).get("batch")):
+            return None
+        try:
+            if (batcher := cls.batchers.get(f)) is None or batcher.config is not config:
+                batcher = cls.batchers[f] = cls(f, config)
+            return batcher
+        except TypeError:  # pragma: no cover
+            return cls(f, config)
+
+    def __call__(self, kwargs):
+        """Value returned by the function for these arguments, computed along with other calls"""
+        key, item = self.key(kwargs), Item(kwargs)
+        with self.cond:
+            queue = self.queues.setdefault(key, [])
+            queue.append(item)
+            item.leader = len(queue) == 1
+            if len(queue) >= self.size:
+                self.cond.notify_all()
+        while True:
+            if item.leader:
+                self.lead(key)
+                break
+            item.event.wait()
+            if not item.leader:
+                break
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def lead(self, key):
+        """Wait for the batch to fill up or the window to pass, then run it; the next calls get a new leader"""
+        deadline = monotonic() + self.window
+        with self.cond:
+            while len(self.queues[key]) < self.size and (left := deadline - monotonic()) > 0:
+                self.cond.wait(left)
+            queue = self.queues.pop(key)
+            batch, rest = queue[: self.size], queue[self.size :]
+            if rest:
+                self.queues[key] = rest
+                rest[0].leader = True
+                rest[0].event.set()
+        self.run(batch)
+
+    def run(self, items):
+        try:
+            results = self.call([item.kwargs for item in items])
+            for item, result in zip(items, results):
+                item.result = result
+        except Exception as e:
+            for item in items:
+                item.error = e
+        for item in items:
+            item.leader = False
+            item.event.set()
+
+    def call(self, records):
+        """Call the function once for many records (dicts of arguments); return their results"""
+        stacked = {k: v if k in self.parameters else [r[k] for r in records] for k, v in records[0].items()}
+        ret, n = self.f(**stacked), len(records)
+        if not isinstance(ret, dict):
+            if len(ret) != n:
+                raise BadOutput(f"Batch-capable step returned {len(ret)} values for {n} inputs.")
+            return list(ret)
+        for k, v in ret.items():
+            if v is not ... and len(v) != n:
+                raise BadOutput(f"Batch-capable step returned {len(v)} values of '{k}' for {n} inputs.")
+        return [{k: v if v is ... else v[i] for k, v in ret.items()} for i in range(n)]
+
+    def evaluate(self, lazies):
+        """Evaluate lazy values (whose dependencies are evaluated) in batches of at most 'size'"""
+        for start in range(0, len(lazies), self.size):
+            chunk = [lazy for lazy in lazies[start : start + self.size] if not restored(lazy)]
+            for lazy in chunk:
+                with lazy.lock:
+                    lazy.resolve()
+            bykey = {}
+            for lazy in chunk:
+                bykey.setdefault(self.key(lazy.deps), []).append(lazy)
+            for group in bykey.values():
+                for lazy, ret in zip(group, self.call([lazy.deps for lazy in group])):
+                    with lazy.lock:
+                        if lazy.result is None:
+                            lazy.settle(ret)
+                            if lazy.checkpoint is not None:
+                                lazy.checkpoint.store(lazy, ret)
+
+    def key(self, kwargs):
+        """Calls can share a batch when they have the same arguments and parameter values"""
+        from ldict.fingerprint import content_hash
+
+        return tuple(sorted((k, content_hash(v) if k in self.parameters else None) for k, v in kwargs.items()))
+
+
+class Item:
+    __slots__ = ("kwargs", "event", "leader", "result", "error")
+
+    def __init__(self, kwargs):
+        self.kwargs, self.event, self.leader, self.result, self.error = kwargs, Event(), False, None, None
+
+
+def evaluate_batched(ldicts, fields=None):
+    """Evaluate 'fields' (default: all) of each ldict; pending values of each batch-capable step go in batches
+
+    Steps run in dependency order; ready values of a batch-capable step are collected across the ldicts.
+
+    >>> from ldict import ldict
+    >>> calls = []
+    >>> def predict(x, scale=2):
+    ...     calls.append(len(x))
+    ...     return {"y": [v * scale for v in x]}
+    >>> predict.metadata = {"batch": 3}
+    >>> ds = [ldict(x=i) >> (lambda x: {"x": x + 1}) >> predict for i in range(7)]
+    >>> evaluate_batched(ds)
+    >>> [d.y for d in ds], calls
+    ([2, 4, 6, 8, 10, 12, 14], [3, 3, 1])
+    >>> (ldict(x=5) >> predict).y, calls  # Alone: a batch of one.
+    (10, [3, 3, 1, 1])
+    """
+    from ldict.core.dag import closure, pending
+
+    left = closure([d.data[k] for d in ldicts for k in (d.data if fields is None else fields)])
+    done = set()  # Dispatched lazy values, by id: a step may return None, which looks like a pending result.
+    while left:
+        groups, seen = {}, set()
+        for lazy in left:
+            if id(lazy.deps) in seen or any(pending(v) and id(v) not in done for v in lazy.deps.values()):
+                continue
+            seen.add(id(lazy.deps))  # Siblings are computed together.
+            if (batcher := MicroBatcher.of(lazy.f)) is None:
+                lazy()
+            else:
+                groups.setdefault(batcher, []).append(lazy)
+        for batcher, group in groups.items():
+            batcher.evaluate(group)
+        done.update(id(lazy) for lazy in left if id(lazy.deps) in seen)
+        left = [lazy for lazy in left if id(lazy) not in done]
+    for d in ldicts:
+        for k in d.data if fields is None else fields:
+            d[k]  # Replace evaluated lazy values by their results.
+
+
+def restored(lazy):
+    if lazy.result is not None:
+        return True
+    if lazy.checkpoint is None:
+        return False
+    with lazy.lock:
+        return lazy.result is not None or lazy.checkpoint.restore(lazy)
@@ -0,0 +1,73 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from threading import Event
+
+from ldict.exception import Cancelled
+
+
+class CancelToken:
+    """Abandon an evaluation: 'd.evaluate(cancel=token)', then 'token.cancel()' from any thread
+
+    Pending steps are not started anymore. A running step stops only if it cooperates:
+    functions with a '_cancel' parameter receive the token and can call 'check()' (or poll 'cancelled').
+    Steps marked with 'metadata["process"] = True' run in a child process, which is terminated.
+    Cancelled lazy values stay pending (what their dependencies computed is kept) and can be evaluated later.
+
+    >>> from ldict import ldict
+    >>> token = CancelToken()
+    >>> def loop(x, _cancel=None):
+    ...     for i in range(1000):
+    ...         if i == 10:
+    ...             token.cancel()  # E.g., by another thread.
+    ...         _cancel.check()
+    ...     return {"y": i}
+    >>> d = ldict(x=1) >> (lambda x: {"w": x + 1}) >> loop
+    >>> d.evaluate(cancel=token)
+    Traceback (most recent call last):
+    ...
+    ldict.exception.Cancelled: Evaluation cancelled.
+    >>> d
+    {
+        "x": 1,
+        "w": 2,
+        "y": "→(x)"
+    }
+    >>> d.y
+    999
+    """
+
+    def __init__(self):
+        self.event = Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        if self.event.is_set():
+            raise Cancelled("Evaluation cancelled.")
+
+    def wait(self, timeout=None):
+        return self.event.wait(timeout)
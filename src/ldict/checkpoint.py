@@ -0,0 +1,157 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+import os
+import warnings
+
+from ldict.fingerprint import function_hash, unstable
+
+
+class Checkpoint:
+    """Write each result to a directory as soon as it is computed, and read it back instead of computing it again
+
+    Applied to an ldict ('d >> Checkpoint(path)'), it is kept by the ldicts derived from it, and covers each
+    function applied afterwards. A function can also ask for it: 'f.metadata["checkpoint"] = path' (or a
+    'Checkpoint' object).
+    A result is stored under the fingerprint of the step (its function and the fingerprints of its inputs,
+    see 'ldict.fingerprint'), so running the same pipeline on the same inputs again restores the completed
+    steps and computes only the missing ones; steps whose results are restored do not need their inputs.
+    The stored digest of the function (code, captured values, global names read, attributes of callable
+    objects; see 'ldict.fingerprint.function_hash') is checked before restoring: a function with a fixed id
+    ('metadata["id"]') whose code or state has changed is computed again.
+    Steps that cannot be identified by content (e.g., reading a value that cannot be serialized) are not
+    checkpointed.
+    Files are written to a temporary name, synced and renamed: a killed process leaves no partial checkpoint.
+
+    >>> from tempfile import mkdtemp
+    >>> from ldict import ldict
+    >>> path = mkdtemp()
+    >>> def f(x):
+    ...     print("computing f")
+    ...     return {"y": x + 1, "z": x - 1}
+    >>> def g(y):
+    ...     print("computing g")
+    ...     return {"w": y * 2}
+    >>> d = ldict(x=1) >> Checkpoint(path) >> f >> g
+    >>> d.w
+    computing f
+    computing g
+    4
+    >>> d = ldict(x=1) >> Checkpoint(path) >> f >> g  # E.g., in a new process.
+    >>> d.w  # Restored; 'f' is not needed.
+    4
+    >>> d.z  # Restored along with its sibling 'y'.
+    0
+    >>> e = ldict(x=2) >> Checkpoint(path) >> f >> g
+    >>> e.w
+    computing f
+    computing g
+    6
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    @classmethod
+    def of(cls, f):
+        """Checkpoint requested by a function (through 'metadata["checkpoint"]'), if any"""
+        from ldict.core.dag import step_metadata
+
+        checkpoint = step_metadata(f).get("checkpoint")
+        return cls(checkpoint) if isinstance(checkpoint, (str, os.PathLike)) else checkpoint or None
+
+    def file(self, lazy):
+        # Siblings share a single file, named after the first one.
+        return os.path.join(self.path, f"{(lazy.lazies or [lazy])[0].fingerprint}.pickle")
+
+    def restore(self, lazy):
+        """Settle 'lazy' (and its siblings) from the checkpoint; return whether it was found and is valid"""
+        import dill
+
+        if not self.covers(lazy):
+            return False
+        try:
+            with open(self.file(lazy), "rb") as fd:
+                record = dill.load(fd)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            warnings.warn(f"Ignoring unreadable checkpoint {self.file(lazy)}: {e!r}")
+            return False
+        if record["code"] != code_hash(lazy.f):
+            warnings.warn(f"Code of step '{record['step']}' has changed since it was checkpointed: computing again.")
+            return False
+        lazy.settle(record["result"])
+        return True
+
+    def store(self, lazy, ret):
+        """Durably write the value returned by the function of 'lazy' (for it and its siblings)"""
+        import dill
+        from ldict.core.dag import step_name
+
+        if not self.covers(lazy) or unstable(code := code_hash(lazy.f)):
+            return
+        file = self.file(lazy)
+        record = {"step": step_name(lazy.f), "code": code, "result": ret}
+        tmp = f"{file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as fd:
+                dill.dump(record, fd, protocol=5)
+                fd.flush()
+                os.fsync(fd.fileno())
+            os.replace(tmp, file)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        sync(self.path)
+
+    def covers(self, lazy):
+        """Whether the step is identified by content, i.e., by a fingerprint that is the same in another run"""
+        return not unstable((lazy.lazies or [lazy])[0].fingerprint)
+
+    def __repr__(self):
+        return f"Checkpoint({self.path!r})"
+
+
+def code_hash(f):
+    """Digest of a function regardless of its declared id: code, captured values, global names read, attributes
+
+    >>> def make(k):
+    ...     return lambda x: x * k
+    >>> code_hash(make(2)) == code_hash(make(2)), code_hash(make(2)) == code_hash(make(3))
+    (True, False)
+    """
+    return function_hash(f, use_id=False)
+
+
+def sync(path):
+    """Make a rename inside the directory 'path' durable (where directories can be opened)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # pragma: no cover
+        return
+    try:
+        os.fsync(fd)
+    except OSError:  # pragma: no cover
+        pass
+    finally:
+        os.close(fd)
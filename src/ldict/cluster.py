@@ -0,0 +1,196 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+import socket
+from hashlib import blake2b
+from heapq import heappop, heappush
+from threading import Condition, Lock, Thread
+from weakref import WeakKeyDictionary
+
+from ldict.scheduler import Scheduler
+from ldict.worker import receive, respond, send
+from ldict.worker import secret as worker_secret
+
+
+class Cluster:
+    """Evaluate the lazy values of many ldicts on workers ('python -m ldict.worker'), over TCP
+
+    'addresses' are (host, port) pairs; each worker gets 'connections' connections, kept open between evaluations.
+    Steps are scheduled as by 'Scheduler' (groups of siblings, critical path first): up to 'batch' ready steps
+    travel per round trip, with their resolved dependencies. Functions are sent once per worker.
+    Steps sent to a worker that is lost are sent again to the remaining ones.
+    Each connection proves to the worker that it knows 'secret' (default: the environment variable LDICT_SECRET);
+    see 'ldict.worker' about security.
+    """
+
+    def __init__(self, addresses, batch=32, connections=1, timeout=None, secret=None):
+        self.addresses = [tuple(address) for address in addresses]
+        self.batch, self.connections, self.timeout = batch, connections, timeout
+        self.secret = worker_secret() if secret is None else secret.encode() if isinstance(secret, str) else secret
+        self.pool, self.lock = {}, Lock()
+        self.dumps = WeakKeyDictionary()
+
+    def evaluate(self, ldicts, fields=None):
+        """Evaluate 'fields' (default: all) of each ldict"""
+        tasks = Scheduler().tasks([d.data[k] for d in ldicts for k in (d.data if fields is None else fields)])
+        ready, cond = [], Condition()
+        state = {"left": len(tasks), "error": None, "seq": 0}
+
+        def release(task):
+            state["seq"] += 1
+            heappush(ready, (-task.priority, state["seq"], task))
+
+        def finish(task):
+            state["left"] -= 1
+            for dependent in task.dependents:
+                dependent.waiting -= 1
+                if dependent.waiting == 0:
+                    release(dependent)
+
+        def work(slot):
+            connection = None
+            while True:
+                with cond:
+                    while not ready and state["left"] and not state["error"]:
+                        cond.wait()
+                    if not state["left"] or state["error"]:
+                        return
+                    batch = [heappop(ready)[2] for _ in range(min(self.batch, len(ready)))]
+                    for task in [task for task in batch if task.lazy.result is not None or restored(task.lazy)]:
+                        batch.remove(task)  # Computed meanwhile (e.g., by reading the field), or checkpointed.
+                        finish(task)
+                    cond.notify_all()
+                if not batch:
+                    continue
+                try:
+                    connection = connection or self.connect(slot)
+                    replies = self.run(connection, batch)
+                except (OSError, ConnectionError, EOFError) as e:
+                    self.drop(slot)
+                    with cond:
+                        for task in batch:
+                            release(task)
+                        workers[0] -= 1
+                        if workers[0] == 0:
+                            state["error"] = ConnectionError(f"All workers were lost; last error: {e!r}")
+                        cond.notify_all()
+                    return
+                with cond:
+                    for (i, ok, value), task in zip(replies, batch):
+                        if ok:
+                            with task.lazy.lock:
+                                if task.lazy.result is None:
+                                    task.lazy.settle(value)
+                                    if task.lazy.checkpoint is not None:
+                                        task.lazy.checkpoint.store(task.lazy, value)
+                        else:
+                            state["error"] = state["error"] or value
+                        finish(task)
+                    cond.notify_all()
+
+        for task in tasks:
+            if task.waiting == 0:
+                release(task)
+        slots = [(address, i) for address in self.addresses for i in range(self.connections)]
+        workers = [len(slots)]
+        threads = [Thread(target=work, args=(slot,), daemon=True) for slot in slots]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if state["error"] is not None:
+            raise state["error"]
+
+    def run(self, connection, batch):
+        """Send a batch of steps through a connection and wait for their results, in the same order"""
+        steps, items = {}, []
+        for i, task in enumerate(batch):
+            lazy = task.lazy
+            with lazy.lock:
+                lazy.resolve()
+            key, dump = self.dump(lazy.f)
+            if key not in connection.sent:
+                steps[key] = dump
+            items.append((i, key, lazy.deps))
+        if steps:
+            send(connection.sock, ("steps", steps))
+            connection.sent.update(steps)
+        send(connection.sock, ("tasks", items))
+        if (reply := receive(connection.sock)) is None:
+            raise ConnectionError("Worker closed the connection.")
+        return sorted(reply[1], key=lambda result: result[0])
+
+    def dump(self, f):
+        """Dill dump of a function and its key (a digest of the dump), computed once per function"""
+        try:
+            if (entry := self.dumps.get(f)) is None:
+                entry = self.dumps[f] = dump(f)
+            return entry
+        except TypeError:  # pragma: no cover
+            # Not weak-referenceable nor hashable.
+            return dump(f)
+
+    def connect(self, slot):
+        with self.lock:
+            if (connection := self.pool.get(slot)) is None:
+                sock = socket.create_connection(slot[0], timeout=self.timeout)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                try:
+                    respond(sock, self.secret)
+                except BaseException:
+                    sock.close()
+                    raise
+                connection = self.pool[slot] = Connection(sock)
+            return connection
+
+    def drop(self, slot):
+        with self.lock:
+            if (connection := self.pool.pop(slot, None)) is not None:
+                connection.sock.close()
+
+    def close(self):
+        for slot in list(self.pool):
+            self.drop(slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def restored(lazy):
+    if lazy.checkpoint is None:
+        return False
+    with lazy.lock:
+        return lazy.result is not None or lazy.checkpoint.restore(lazy)
+
+
+class Connection:
+    def __init__(self, sock):
+        self.sock, self.sent = sock, set()
+
+
+def dump(f):
+    import dill
+
+    content = dill.dumps(f, protocol=5, recurse=True)
+    return blake2b(content, digest_size=20).hexdigest(), content
@@ -21,10 +21,13 @@
 #  time spent here.
 from abc import abstractmethod, ABC
 from collections import UserDict
+from contextlib import contextmanager
 from random import Random
 from typing import Dict, TypeVar
 
 from ldict.exception import WrongKeyType
+from ldict.core.dag import pending
+from ldict.lazyval import LazyVal
 
 VT = TypeVar("VT")
 
@@ -59,8 +62,13 @@ class AbstractLazyDict(UserDict, Dict[str, VT]):
         self.evaluate()
         return self
 
-    def evaluate(self):
-        """
+    def evaluate(self, fields=None, deadline=None, cancel=None, costs=None):
+        """Evaluate all fields, or only 'fields' and what they depend on
+
+        With a 'deadline' (in seconds), return the fields that could be evaluated in time, using the durations
+        in 'costs' (default: those recorded by all evaluations); see 'dag.evaluate_until'.
+        A 'CancelToken' can abandon the evaluation (raising 'Cancelled'); see 'ldict.cancel'.
+
         >>> from ldict import ldict
         >>> f = lambda x: {"y": x+2}
         >>> d = ldict(x=3)
@@ -76,18 +84,96 @@ class AbstractLazyDict(UserDict, Dict[str, VT]):
             "x": 3,
             "y": 5
         }
+        >>> b = d >> f >> (lambda x: {"z": x * 2}) >> (lambda y: {"w": y + 1})
+        >>> b.evaluate(fields=["w"])
+        >>> b.evaluated_keys(), b.is_evaluated("z")
+        (['x', 'y', 'w'], False)
         """
-        for field in self:
+        if deadline is not None:
+            from ldict.core.dag import evaluate_until
+
+            return evaluate_until(self, list(self) if fields is None else fields, deadline, cancel, costs)
+        for field in self if fields is None else fields:
+            if cancel is not None and isinstance(lazy := self.data[field], LazyVal):
+                lazy(cancel)
             v = self[field]
             if isinstance(v, AbstractLazyDict):
-                v.evaluate()
+                v.evaluate(cancel=cancel)
+
+    def graph(self):
+        """Dependency graph, with critical path and parallelism; see 'dag.Graph'"""
+        from ldict.core.dag import Graph
+
+        return Graph(self.frozen if isinstance(self, AbstractMutableLazyDict) else self)
+
+    def lazy_items(self):
+        """Pairs (field, value) without evaluating anything: pending values are given as 'LazyVal' objects
+
+        >>> from ldict import ldict
+        >>> d = ldict(x=3) >> (lambda x: {"y": x + 2, "z": x * 2})
+        >>> d.y
+        5
+        >>> list(d.lazy_items())  # 'z' was computed along with its sibling 'y'.
+        [('x', 3), ('y', 5), ('z', 6)]
+        >>> list((ldict(x=3) >> (lambda x: {"y": x + 2})).lazy_items())
+        [('x', 3), ('y', →(x))]
+        """
+        for k, v in self.data.items():
+            yield k, v.result if isinstance(v, LazyVal) and v.result is not None else v
+
+    def evaluated_keys(self):
+        return [k for k, v in self.data.items() if not pending(v)]
+
+    def is_evaluated(self, key):
+        return not pending(self.data[key])
+
+    def todict(self, evaluate=True):
+        """Convert to dict, like 'asdict'; pending values are kept as 'LazyVal' placeholders unless 'evaluate'
+
+        >>> from ldict import ldict
+        >>> d = ldict(x=3, e=ldict(a=1) >> (lambda a: {"b": a})) >> (lambda x: {"y": x + 2})
+        >>> d.todict(evaluate=False)
+        {'x': 3, 'e': {'a': 1, 'b': →(a)}, 'y': →(x)}
+        >>> d.todict()
+        {'x': 3, 'e': {'a': 1, 'b': 1}, 'y': 5}
+        """
+        if evaluate:
+            return self.asdict
+        dic = {}
+        for k, v in self.lazy_items():
+            dic[k] = v.todict(evaluate=False) if isinstance(v, AbstractLazyDict) else v
+        return dic
+
+    def sample(self, fs, n, rnd=None, workers=None) -> list:
+        """Distinct variants from 'n' applications of 'fs' sharing unaffected lazy values; see 'parameter.sampling'"""
+        from ldict.parameter.sampling import sample
+
+        return sample(self, fs, n, rnd, workers)
+
+    def grid(self, fs, workers=None):
+        """Stream '(parameters, leaf)' for every combination of parameter values of 'fs'; see 'parameter.grid'"""
+        from ldict.parameter.grid import grid
+
+        return grid(self, fs, workers)
 
     def __ne__(self, other):
         return not (self == other)
 
 
 class AbstractMutableLazyDict(AbstractLazyDict, ABC):
-    frozen: AbstractLazyDict
+    _frozen: AbstractLazyDict
+    _pending = None
+    """Assignments (value None means deletion) collected inside 'batch()', in order"""
+
+    @property
+    def frozen(self):
+        if self._pending:
+            self.flush()
+        return self._frozen
+
+    @frozen.setter
+    def frozen(self, frozen):
+        self._frozen = frozen
 
     @property
     def rnd(self):
@@ -97,16 +183,120 @@ class AbstractMutableLazyDict(AbstractLazyDict, ABC):
     def data(self):
         return self.frozen.data
 
+    def __reduce__(self):
+        """
+        >>> import pickle
+        >>> from ldict import ldict
+        >>> d = ldict(x=3) >> (lambda x: {"y": x + 2})
+        >>> d2 = pickle.loads(pickle.dumps(d))
+        >>> d2
+        {
+            "x": 3,
+            "y": "→(x)"
+        }
+        >>> d2.y, d
+        (5, {
+            "x": 3,
+            "y": "→(x)"
+        })
+        """
+        return self.__class__, (), {"_frozen": self.frozen}
+
     def __getitem__(self, item):
         return self.frozen[item]
 
     def __setitem__(self, key: str, value):
-        if not isinstance(key, str):  # pragma: no cover
-            raise WrongKeyType(f"Key must be string, not {type(key)}.", key)
-        self.frozen >>= {key: value}
+        self.update([(key, value)])
+
+    def __delitem__(self, key):
+        self.delete_many([key])
+
+    def update(self, other=(), /, **kwargs):
+        """Assign many fields with a single copy of the data; values behave as in '__setitem__'
+
+        >>> from ldict import ldict
+        >>> d = ldict(x=1)
+        >>> d.update({f"x{i}": i for i in range(3)}, y=lambda x: x * 10)
+        >>> d
+        {
+            "x": 1,
+            "x0": 0,
+            "x1": 1,
+            "x2": 2,
+            "y": "→(x)"
+        }
+        """
+        items = list(other.items() if hasattr(other, "keys") else other)
+        items.extend(kwargs.items())
+        for key, _ in items:
+            if not isinstance(key, str):
+                raise WrongKeyType(f"Key must be string, not {type(key)}.", key)
+        if self._pending is None:
+            self.apply(items)
+        else:
+            for key, value in items:
+                self._pending.append((key, value))
+                if value is None:
+                    self._absent(key)
+                else:
+                    self._present[key] = True
+
+    def delete_many(self, keys):
+        """Remove many fields with a single copy of the data
+
+        >>> from ldict import ldict
+        >>> d = ldict(x=1, y=2, z=3)
+        >>> d.delete_many(["x", "z"])
+        >>> d
+        {
+            "y": 2
+        }
+        """
+        self.update((key, None) for key in keys)
+
+    @contextmanager
+    def batch(self):
+        """Collect assignments and deletions, and apply them with a single copy on exit (or on the next read)
+
+        >>> from ldict import ldict
+        >>> d = ldict(x=1)
+        >>> with d.batch():
+        ...     for i in range(10_000):
+        ...         d[f"f{i}"] = i
+        ...     d["y"] = lambda x, f9999: x + f9999
+        ...     del d["f0"]
+        >>> len(d), d.y
+        (10001, 10000)
+        """
+        if self._pending is not None:  # Nested batch.
+            yield self
+            return
+        self._pending, self._present = [], {}
+        try:
+            yield self
+        finally:
+            self.flush()
+            self._pending = None
+
+    def flush(self):
+        items, self._pending, self._present = self._pending, [], {}
+        self.apply(items)
+
+    def apply(self, items):
+        from ldict.core.rshift import handle_dict
+
+        frozen = self._frozen
+        self._frozen = frozen.derive(handle_dict(frozen.data, items, frozen.rnd), [k for k, _ in items])
+
+    def _absent(self, key):
+        """Check a deletion inside 'batch()' as it would be checked outside of it"""
+        if not self._present.get(key, key in self._frozen.data):
+            self._pending.pop()
+            raise KeyError(key)
+        self._present[key] = False
 
     def __getattr__(self, item):
-        if item in self.frozen:
+        if item != "_frozen" and item in self.frozen:
             return self.frozen[item]
         return self.__getattribute__(item)
 
@@ -128,3 +318,12 @@ class AbstractMutableLazyDict(AbstractLazyDict, ABC):
 
     def __eq__(self, other):
         return self.frozen == other
+
+    __hash__ = None  # Mutable: use 'fingerprint' as a key for the current content.
+
+    @property
+    def fingerprint(self):
+        return self.frozen.fingerprint
+
+    def equals(self, other, strict=True):
+        return self.frozen.equals(other, strict)
@@ -0,0 +1,307 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+"""Dependency graph of pending lazy values"""
+from heapq import heappop, heappush
+from time import monotonic, perf_counter
+
+from ldict.lazyval import LazyVal
+
+costs = {}
+"""Recent duration (in seconds) of each function ('function_id') measured by 'evaluate_until'"""
+
+
+def pending(value):
+    return isinstance(value, LazyVal) and value.result is None
+
+
+def closure(lazies):
+    """Pending lazy values needed by 'lazies' (included), dependencies first
+
+    >>> f = lambda **kw: 0
+    >>> a = LazyVal("a", f, {}, {}, None)
+    >>> b = LazyVal("b", f, {"a": a}, {}, None)
+    >>> c = LazyVal("c", f, {"a": a, "b": b}, {}, None)
+    >>> [lazy.field for lazy in closure([c, a])]
+    ['a', 'b', 'c']
+    """
+    order, seen = [], set()
+    stack = [(lazy, False) for lazy in reversed(lazies) if pending(lazy)]
+    while stack:
+        lazy, expanded = stack.pop()
+        if expanded:
+            order.append(lazy)
+        elif id(lazy) not in seen:
+            seen.add(id(lazy))
+            stack.append((lazy, True))
+            stack.extend((v, False) for v in lazy.deps.values() if pending(v) and id(v) not in seen)
+    return order
+
+
+def evaluate_until(d, fields, seconds, cancel=None, costs=None):
+    """Evaluate 'fields' of 'd' one step at a time, in dependency order, while there are 'seconds' left
+
+    No step is started after the deadline, nor when its recorded duration would exceed it.
+    Among the steps that are ready, the fastest go first.
+    Durations are read from and recorded in 'costs', a dict by function id (default: the shared 'dag.costs').
+    Return the fields that are evaluated; the others stay lazy and can be resumed later.
+    Nested ldicts get the remaining time.
+
+    >>> from time import sleep
+    >>> from ldict import ldict
+    >>> def slow(x):
+    ...     sleep(0.2)
+    ...     return {"y": x + 1}
+    >>> f, g = (lambda y: {"z": y * 2}), (lambda x: {"w": x * 3})
+    >>> table = {}
+    >>> d = ldict(x=1) >> slow >> f >> g
+    >>> d.evaluate(deadline=0.1, costs=table)  # 'slow' overruns the deadline.
+    ['x', 'y']
+    >>> e = ldict(x=1) >> slow >> f >> g
+    >>> e.evaluate(deadline=0.1, costs=table)  # 'slow' is known to take too long now.
+    ['x', 'w']
+    >>> e
+    {
+        "x": 1,
+        "y": "→(x)",
+        "z": "→(y→(x))",
+        "w": 3
+    }
+    >>> e.evaluate(deadline=1, fields=["z"], costs=table)  # Resume.
+    ['z']
+    """
+    from ldict.core.base import AbstractLazyDict
+
+    costs = globals()["costs"] if costs is None else costs
+    end = monotonic() + seconds
+    data = d.data
+    nodes = closure([data[k] for k in fields])
+    waiting, dependents = {}, {}
+    for node in nodes:
+        deps = [v for v in node.deps.values() if pending(v)]
+        waiting[id(node)] = len(deps)
+        for dep in deps:
+            dependents.setdefault(id(dep), []).append(node)
+    ready, ids = [], {}
+    for node in nodes:
+        if waiting[id(node)] == 0:
+            push(ready, node, ids, costs)
+    while ready:
+        *_, fid, node = heappop(ready)
+        if node.result is None:  # Not computed along with a sibling.
+            now = monotonic()
+            if now >= end or now + costs.get(fid, 0) > end:
+                continue
+            start = perf_counter()
+            node(cancel)
+            costs[fid] = perf_counter() - start
+        for dependent in dependents.get(id(node), []):
+            waiting[id(dependent)] -= 1
+            if waiting[id(dependent)] == 0:
+                push(ready, dependent, ids, costs)
+
+    completed = []
+    for k in fields:
+        v = data[k]
+        if isinstance(v, LazyVal) and v.result is not None:
+            v = data[k] = v.result
+        if isinstance(v, AbstractLazyDict):
+            if (left := end - monotonic()) <= 0 or len(v.evaluate(None, left, cancel, costs)) < len(v):
+                continue
+        if not pending(v):
+            completed.append(k)
+    return completed
+
+
+def push(heap, node, ids, costs):
+    from ldict.core.inspection import function_id
+
+    if (fid := ids.get(id(node.f))) is None:
+        fid = ids[id(node.f)] = function_id(node.f)
+    # Unknown durations count as zero: they will be known next time.
+    heappush(heap, (costs.get(fid, 0), len(heap), id(node), fid, node))
+
+
+def topological(predecessors):
+    """Keys of a DAG given as a dict key -> predecessor keys, predecessors first
+
+    >>> topological({"c": {"a", "b"}, "b": {"a"}, "a": set()})
+    ['a', 'b', 'c']
+    """
+    order, seen = [], set()
+    stack = [(key, False) for key in reversed(list(predecessors))]
+    while stack:
+        key, expanded = stack.pop()
+        if expanded:
+            order.append(key)
+        elif key not in seen:
+            seen.add(key)
+            stack.append((key, True))
+            stack.extend((k, False) for k in predecessors[key] if k not in seen)
+    return order
+
+
+def step_metadata(f):
+    """Metadata of a function, or of the function it wraps (e.g., in 'sweep')"""
+    if (metadata := getattr(f, "metadata", None)) is None:
+        metadata = getattr(getattr(f, "__wrapped__", None), "metadata", {})
+    return metadata
+
+
+def step_name(f):
+    return step_metadata(f).get("name") or getattr(getattr(f, "__wrapped__", f), "__name__", type(f).__name__)
+
+
+class Graph:
+    """Dependency graph of an ldict: its fields, the lazy values behind them and what these depend on
+
+    Lazy values that are not fields anymore (e.g., overwritten) are nodes named 'field@n'.
+    Dependencies that are not fields are listed as parameters of the node.
+    Sibling nodes (outputs of the same call) form a group, which is a single step for the analysis:
+    'work' is the sum of step costs, 'span' is the cost of the critical path (the slowest chain of
+    dependent steps) and 'parallelism' is their ratio, i.e., the speedup bound for a parallel executor.
+    Costs come from 'metadata["cost"]', from the durations recorded by 'evaluate_until'/'Scheduler' or, else, 1.
+
+    >>> from ldict import ldict
+    >>> f = lambda x, a=2: {"y": x * a, "z": x + a}
+    >>> f.metadata = {"name": "f", "cost": 3}
+    >>> g = lambda y: {"w": y - 1}
+    >>> h = lambda x: {"v": -x}
+    >>> graph = (ldict(x=1) >> f >> g >> h).graph()
+    >>> graph.nodes["y"]
+    {'kind': 'lazy', 'step': 'f', 'status': 'pending', 'parameters': {'a': 2}}
+    >>> graph.edges
+    [('x', 'y'), ('x', 'z'), ('y', 'w'), ('x', 'v')]
+    >>> graph.groups, graph.critical_path, (graph.work, graph.span, graph.parallelism)
+    ([['y', 'z']], ['y', 'w'], (5, 4, 1.25))
+    >>> print(graph.to_dot())  # doctest: +ELLIPSIS
+    digraph ldict {
+        "x" [shape=ellipse];
+        "y" [shape=box, label="y\\nf(a=2)", color=red];
+    ...
+        "y" -> "w" [color=red];
+    ...
+    """
+
+    def __init__(self, d):
+        from ldict.core.inspection import function_id
+
+        data, origins = d.data, d._origins
+        nodes, edges, names = {}, [], {}  # names: id(lazy) -> node name
+        steps, groups = {}, {}  # node name -> group key; group key -> (node names, cost)
+        stack = []
+        for k in data:
+            if (lazy := origins.get(k)) is None:
+                nodes[k] = {"kind": "value"}
+            else:
+                names[id(lazy)] = k
+                stack.append((k, lazy))
+        while stack:
+            name, lazy = stack.pop()
+            if name in nodes:
+                continue
+            parameters = {}
+            for k in lazy.deps:
+                if k == "_":  # Placeholder of noop functions.
+                    continue
+                v = lazy.upstream.get(k, lazy.deps[k])
+                if isinstance(v, LazyVal):
+                    if (source := names.get(id(v))) is None:
+                        source = names[id(v)] = f"{k}@{len(names)}"
+                        stack.append((source, v))
+                    edges.append((source, name))
+                elif k in data and k not in origins and data[k] is v:
+                    edges.append((k, name))
+                else:
+                    parameters[k] = v
+            status = "pending" if lazy.result is None else "done"
+            nodes[name] = {"kind": "lazy", "step": step_name(lazy.f), "status": status, "parameters": parameters}
+            steps[name] = key = id(lazy.deps)  # Siblings share their dependencies.
+            if key not in groups:
+                groups[key] = [], step_metadata(lazy.f).get("cost", costs.get(function_id(lazy.f), 1))
+            groups[key][0].append(name)
+
+        # Fields first, in their order; then intermediate values, as found.
+        order = {k: i for i, k in enumerate([k for k in data] + [k for k in nodes if k not in data])}
+        self.nodes = {k: nodes[k] for k in sorted(nodes, key=order.get)}
+        self.edges = sorted(edges, key=lambda edge: (order[edge[1]], order[edge[0]]))
+        self.groups = [sorted(group, key=order.get) for group, _ in groups.values() if len(group) > 1]
+
+        predecessors = {key: set() for key in groups}
+        for source, target in self.edges:
+            if source in steps and steps[source] != steps[target]:
+                predecessors[steps[target]].add(steps[source])
+        # Cost of the slowest chain of steps ending at each step, predecessors first.
+        span, previous = {}, {}
+        for key in topological(predecessors):
+            previous[key] = max(predecessors[key], key=span.get, default=None)
+            span[key] = groups[key][1] + (0 if previous[key] is None else span[previous[key]])
+
+        self.work = sum(cost for _, cost in groups.values())
+        last = max(groups, key=span.get, default=None)
+        self.span = 0 if last is None else span[last]
+        self.parallelism = self.work / self.span if self.span else 1.0
+        path, linked = [], set(self.edges)
+        while last is not None:
+            # The sibling feeding the next step on the path stands for the group.
+            members = sorted(groups[last][0], key=order.get)
+            path.append(next((m for m in members if path and (m, path[-1]) in linked), members[0]))
+            last = previous[last]
+        self.critical_path = path[::-1]
+
+    def asdict(self):
+        return {
+            "nodes": self.nodes,
+            "edges": self.edges,
+            "groups": self.groups,
+            "critical_path": self.critical_path,
+            "work": self.work,
+            "span": self.span,
+            "parallelism": self.parallelism,
+        }
+
+    def to_json(self, **kwargs):
+        import json
+
+        return json.dumps(self.asdict(), default=repr, **kwargs)
+
+    def to_dot(self):
+        critical, lines = set(self.critical_path), ["digraph ldict {"]
+        for name, node in self.nodes.items():
+            if node["kind"] == "value":
+                lines.append(f'    "{name}" [shape=ellipse];')
+                continue
+            parameters = ", ".join(f"{k}={v!r}" for k, v in node["parameters"].items()).replace('"', "'")
+            attributes = f'shape=box, label="{name}\\n{node["step"]}({parameters})"'
+            if node["status"] == "done":
+                attributes += ", style=filled"
+            if name in critical:
+                attributes += ", color=red"
+            lines.append(f'    "{name}" [{attributes}];')
+        for i, group in enumerate(self.groups):
+            members = " ".join(f'"{name}";' for name in group)
+            lines.append(f"    subgraph cluster_{i} {{ style=dashed; {members} }}")
+        pairs = set(zip(self.critical_path, self.critical_path[1:]))
+        for source, target in self.edges:
+            style = " [color=red]" if (source, target) in pairs else ""
+            lines.append(f'    "{source}" -> "{target}"{style};')
+        lines.append("}")
+        return "\n".join(lines)
@@ -20,6 +20,8 @@
 #  part of this work is illegal and unethical regarding the effort and
 #  time spent here.
 import re
+from functools import lru_cache
+from hashlib import blake2b
 from inspect import signature
 from io import StringIO
 from pprint import pprint
@@ -39,7 +41,7 @@ def extract_input(f):
     if hasattr(f, "metadata") and "input" in f.metadata:
         fields = {k: None for k in f.metadata["input"]["fields"]} if "fields" in f.metadata["input"] else {}
         hasparams = "parameters" in f.metadata["input"] and f.metadata["input"]["parameters"] is not ...
-        parameters = f.metadata["input"]["parameters"] if hasparams else {}
+        parameters = f.metadata["input"]["parameters"].copy() if hasparams else {}
         hasoptional = "optional" in f.metadata["input"] and f.metadata["input"]["optional"] is not ...
         optional = f.metadata["input"]["optional"] if hasoptional else {}
         return fields, parameters, optional
@@ -131,34 +133,20 @@ def extract_output(f, body, deps, ismulti_output, dynamic):
     (['z', 'w', 'k'], ['_metafield2'], ['_history', '_code'])
     """
 
-    memo = [""]
+    spec = []
 
-    def lazy_dictstr():
-        memo[0] = extract_returnstr("".join(body))
-        if ismulti_output:
-            memo[0] = extract_dictstr(memo[0])
-        return memo[0]
+    def parsed(i):
+        if not spec:
+            returnstr = extract_returnstr("".join(body))
+            spec.extend(output_spec(extract_dictstr(returnstr) if ismulti_output else returnstr))
+        return spec[i]
 
     metadata_output = f.metadata["output"] if hasattr(f, "metadata") and "output" in f.metadata else {}
-    if "fields" in metadata_output:
-        explicit = metadata_output["fields"].copy()
-    else:
-        explicit = re.findall(r"[\"']([a-zA-Z]+[_a-zA-Z0-9]*)[\"']:", lazy_dictstr())
-    if "auto" in metadata_output:
-        meta_ellipsed = metadata_output["auto"]
-    else:
-        meta_ellipsed = re.findall(r"[\"'](_[_a-zA-Z]+[_a-zA-Z0-9]*)[\"']:[ ]*?\.\.\.[,}]", lazy_dictstr())
-        meta_ellipsed.extend(re.findall(r"[\"'](_[_a-zA-Z]+[_a-zA-Z0-9]*)[\"']:[ ]*?Ellipsis[,}]", lazy_dictstr()))
-    if "meta" in metadata_output:
-        meta = metadata_output["meta"]
-    else:
-        meta = re.findall(r"[\"'](_[_a-zA-Z]+[_a-zA-Z0-9]*)[\"']:", lazy_dictstr())
-        meta = [item for item in meta if item not in meta_ellipsed]
-    if not dynamic:
-        # REMINDER: The variable brings the field name. E.g.: Xout="X"
-        dynamic = re.findall(r"[ {]([_a-zA-Z]+[_a-zA-Z0-9]*):", lazy_dictstr())
-        # multidynamic = re.findall(r"[ {]kwargs\[([_a-zA-Z]+[_a-zA-Z0-9]*)\[[^]]+?]]:", lazy_dictstr())
-        # dynamic.extend(multidynamic)
+    explicit = (metadata_output["fields"] if "fields" in metadata_output else parsed(0)).copy()
+    meta_ellipsed = metadata_output["auto"] if "auto" in metadata_output else parsed(2)
+    meta = metadata_output["meta"] if "meta" in metadata_output else [m for m in parsed(1) if m not in meta_ellipsed]
+    if not dynamic and "dynamic" not in metadata_output:
+        dynamic = parsed(3)
 
     for field in dynamic:
         # if "_" in field:  # pragma: no cover
@@ -170,11 +158,26 @@ def extract_output(f, body, deps, ismulti_output, dynamic):
         else:
             explicit.append(deps[field])
     if not explicit:  # pragma: no cover
-        pprint(lazy_dictstr())
+        pprint(spec)
         raise BadOutput("Could not find output fields that are valid identifiers (or kwargs[...]):")
     return explicit, meta, meta_ellipsed
 
 
+def output_spec(dictstr):
+    """Output fields, metafields, metafields to autofill ('...') and parameters bringing field names
+
+    >>> output_spec("{'z': x*y, implicitfield: y**2, '_history': ..., '_code': Ellipsis, '_meta': 'text'}")
+    (['z'], ['_meta'], ['_history', '_code'], ['implicitfield'])
+    """
+    explicit = re.findall(r"[\"']([a-zA-Z]+[_a-zA-Z0-9]*)[\"']:", dictstr)
+    auto = re.findall(r"[\"'](_[_a-zA-Z]+[_a-zA-Z0-9]*)[\"']:[ ]*?\.\.\.[,}]", dictstr)
+    auto.extend(re.findall(r"[\"'](_[_a-zA-Z]+[_a-zA-Z0-9]*)[\"']:[ ]*?Ellipsis[,}]", dictstr))
+    meta = [item for item in re.findall(r"[\"'](_[_a-zA-Z]+[_a-zA-Z0-9]*)[\"']:", dictstr) if item not in auto]
+    # REMINDER: The variable brings the field name. E.g.: Xout="X"
+    dynamic = re.findall(r"[ {]([_a-zA-Z]+[_a-zA-Z0-9]*):", dictstr)
+    return explicit, meta, auto, dynamic
+
+
 def extract_dynamic_input(bodystr):
     """The variable brings the field name, so we can get the field content from kwargs.
 
@@ -187,5 +190,40 @@ def extract_dynamic_input(bodystr):
     return sorted(list(single))
 
 
+def function_id(f):
+    """Identifier of a function that is stable across runs and processes: 'metadata["id"]' or a digest of its code
+
+    Functions with the same code (e.g., closures created by the same 'def') share the identifier,
+    unless they wrap ('__wrapped__') different functions. It names the step (e.g., for recorded durations);
+    fingerprints also depend on captured values and attributes ('ldict.fingerprint.function_hash').
+
+    >>> f = lambda x: {"y": x + 1}
+    >>> g = lambda x: {"y": x + 1}
+    >>> function_id(f) == function_id(g), function_id(f) == function_id(lambda x: {"y": x + 2})
+    (True, False)
+    >>> f.metadata = {"id": "my-step"}
+    >>> function_id(f)
+    'my-step'
+    """
+    if hasattr(f, "metadata") and "id" in f.metadata:
+        return f.metadata["id"]
+    code = getattr(f, "__code__", None) or getattr(getattr(type(f), "__call__", None), "__code__", None)
+    if code is None:  # pragma: no cover
+        return f"{type(f).__module__}.{type(f).__qualname__}"
+    if (wrapped := getattr(f, "__wrapped__", None)) is not None:
+        return blake2b(f"{code_digest(code)}{function_id(wrapped)}".encode(), digest_size=20).hexdigest()
+    return code_digest(code)
+
+
+@lru_cache(maxsize=4096)
+def code_digest(code):
+    h = blake2b(digest_size=20)
+    h.update(code.co_code)
+    for const in code.co_consts:
+        h.update(code_digest(const).encode() if hasattr(const, "co_code") else repr(const).encode())
+    h.update(repr((code.co_names, code.co_varnames, code.co_freevars)).encode())
+    return h.hexdigest()
+
+
 class CodeExtractionException(Exception):
     pass
@@ -24,7 +24,6 @@ from random import Random
 from typing import Dict, TypeVar, Union, Callable
 
 from ldict.core.base import AbstractMutableLazyDict, AbstractLazyDict
-from ldict.exception import WrongKeyType
 from ldict.frozenlazydict import FrozenLazyDict
 from ldict.parameter.functionspace import FunctionSpace
 from ldict.parameter.let import AbstractLet
@@ -176,13 +175,6 @@ class Ldict(AbstractMutableLazyDict):
     def __init__(self, /, _dictionary=None, rnd=None, **kwargs):
         self.frozen: FrozenLazyDict = FrozenLazyDict(_dictionary or kwargs, rnd=rnd)
 
-    def __delitem__(self, key):
-        if not isinstance(key, str):
-            raise WrongKeyType(f"Key must be string, not {type(key)}.", key)
-        data = self.frozen.data.copy()
-        del data[key]
-        self.frozen = self.frozen.clone(data)
-
     def clone(self, data=None, rnd=None):
         """Same lazy content with (optional) new data or rnd object."""
         return self.__class__(self.frozen.data if data is None else data, rnd=rnd or self.rnd)
@@ -0,0 +1,101 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from collections.abc import MutableMapping
+
+
+class Overlay(MutableMapping):
+    """Fields of an ldict given as assignments and deletions pending over the data of another ldict
+
+    Each '>>' step of a chain extends a copy of the (small) overlay instead of copying all fields;
+    'copy()' builds the resulting dict once, in the same order as assigning/deleting step by step would.
+    'assigned' tracks the origins (see 'FrozenLazyDict._origins') replaced along the chain: a lazy value, or None.
+
+    >>> base = {"x": 1, "y": 2, "z": 3}
+    >>> o = Overlay(base, {})
+    >>> o["w"], o["x"] = 4, 0
+    >>> del o["y"]
+    >>> e = o.extend()
+    >>> e["y"] = 5
+    >>> o.copy(), e.copy(), list(e), len(e), base
+    ({'x': 0, 'z': 3, 'w': 4}, {'x': 0, 'z': 3, 'w': 4, 'y': 5}, ['x', 'z', 'w', 'y'], 4, {'x': 1, 'y': 2, 'z': 3})
+    """
+
+    __slots__ = ("base", "origins", "delta", "removed", "assigned")
+
+    def __init__(self, base, origins, delta=None, removed=None, assigned=None):
+        self.base, self.origins = base, origins
+        self.delta = {} if delta is None else delta
+        self.removed = set() if removed is None else removed
+        self.assigned = {} if assigned is None else assigned
+
+    def extend(self):
+        """Overlay for the next step: pending changes are copied, the base data is shared"""
+        return Overlay(self.base, self.origins, self.delta.copy(), self.removed.copy(), self.assigned.copy())
+
+    def __contains__(self, key):
+        return key in self.delta or key not in self.removed and key in self.base
+
+    def __getitem__(self, key):
+        if key in self.delta:
+            return self.delta[key]
+        if key in self.removed:
+            raise KeyError(key)
+        return self.base[key]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __setitem__(self, key, value):
+        # Base fields keep their position (as in a dict); new and deleted+assigned ones go to the end.
+        self.delta[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.delta.pop(key, None)
+        if key in self.base:
+            self.removed.add(key)
+
+    def __iter__(self):
+        removed, base = self.removed, self.base
+        yield from (k for k in base if k not in removed)
+        yield from (k for k in self.delta if k in removed or k not in base)
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + sum(1 for k in self.delta if k in self.removed or k not in self.base)
+
+    def copy(self):
+        """Resulting dict: the single copy of the chain"""
+        if self.removed:
+            data = {k: v for k, v in self.base.items() if k not in self.removed}
+        else:
+            data = self.base.copy()
+        data.update(self.delta)
+        return data
+
+    def copy_origins(self):
+        """Resulting origins"""
+        if not self.assigned:
+            return self.origins.copy()
+        origins = {k: v for k, v in self.origins.items() if k not in self.assigned}
+        origins.update((k, v) for k, v in self.assigned.items() if v is not None)
+        return origins
@@ -0,0 +1,136 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+import operator
+from functools import reduce
+
+from ldict.core.ldict_ import Ldict
+from ldict.lazyval import FunctionHandle, LazyVal
+from ldict.parameter.abslet import AbstractLet
+from ldict.parameter.functionspace import FunctionSpace
+
+
+class ReactiveLdict(Ldict):
+    """Mutable lazy dict that recomputes, on assignment, only the fields depending on the assigned ones
+
+    Each function applied ('>>') is logged along with the fields it read and the fields it returned.
+    Assigning fields replays, in order, only the logged functions reading (directly or transitively) an
+    assigned field: their outputs become new lazy values over the new content. Other fields, evaluated or
+    not, are kept as they are. 'invalidated' lists the fields replaced by the last assignment.
+    An assigned field that was an output keeps the assigned value when its function is replayed.
+    Parameters sampled from lists (through a Random object) are drawn again on replay.
+    Changes are atomic: if a replayed function fails (e.g., it reads a deleted field), nothing is changed.
+
+    >>> calls = []
+    >>> def f(x):
+    ...     calls.append("f")
+    ...     return {"y": x + 1}
+    >>> def g(z):
+    ...     calls.append("g")
+    ...     return {"w": z * 2}
+    >>> h = lambda y, w: {"v": y + w}
+    >>> d = ReactiveLdict(x=1, z=10) >> f >> g >> h
+    >>> d.v, calls
+    (22, ['f', 'g'])
+    >>> d["x"] = 5
+    >>> d.invalidated
+    ['y', 'v']
+    >>> d.evaluated_keys()
+    ['x', 'z', 'w']
+    >>> d.v, calls  # 'g' is not called again.
+    (26, ['f', 'g', 'f'])
+    >>> d.update(y=0)  # An output is overridden: 'f' is not replayed for it anymore.
+    >>> d.invalidated, d.v
+    (['v'], 20)
+    >>> d["x"] = 7
+    >>> d.invalidated, d.v
+    ([], 20)
+    >>> del d["z"]  # 'g' reads it.
+    Traceback (most recent call last):
+    ...
+    ldict.exception.DependenceException: ("Missing field 'z'.", dict_keys(['x', 'y', 'w', 'v']))
+    >>> list(d)  # Unchanged.
+    ['x', 'z', 'y', 'w', 'v']
+    """
+
+    # noinspection PyMissingConstructor
+    def __init__(self, /, _dictionary=None, rnd=None, **kwargs):
+        super().__init__(_dictionary, rnd=rnd, **kwargs)
+        self.log = []
+        """Applied functions as tuples (function, fields read, fields returned), in order"""
+        self.invalidated = []
+
+    def __rshift__(self, other):
+        if isinstance(other, FunctionSpace):
+            return reduce(operator.rshift, (self,) + other.functions)
+        clone = self.__class__()
+        clone.frozen = frozen = self.frozen >> other
+        clone.log = self.log
+        if (callable(other) or isinstance(other, AbstractLet)) and frozen is not self.frozen and frozen.returned:
+            reads = set()
+            for k in frozen.returned:
+                if isinstance(v := frozen.data[k], LazyVal):
+                    reads.update(k for k in v.deps if k in self.frozen.data)
+            clone.log = self.log + [(other, reads, list(frozen.returned))]
+        return clone
+
+    def __reduce__(self):
+        log = [(FunctionHandle.of(f), reads, outputs) for f, reads, outputs in self.log]
+        return self.__class__, (), {"_frozen": self.frozen, "log": log, "invalidated": self.invalidated}
+
+    def apply(self, items):
+        """Assign/delete fields and replay the dependent functions; nothing changes if replaying fails"""
+        previous = self._frozen
+        super().apply(items)
+        assigned = {k for k, _ in items}
+        # Assigned fields are not outputs anymore.
+        log = [(f, reads, [k for k in outputs if k not in assigned]) for f, reads, outputs in self.log]
+        log = [entry for entry in log if entry[2]]
+        try:
+            frozen, invalidated = self.replay(self._frozen, log, assigned)
+        except Exception:
+            self._frozen = previous
+            raise
+        self._frozen, self.log, self.invalidated = frozen, log, invalidated
+
+    @staticmethod
+    def replay(frozen, log, assigned):
+        """Apply again the logged functions reading 'assigned' fields, or outputs of replayed functions
+
+        Return the resulting frozen dict and the replaced fields."""
+        dirty, invalidated = set(assigned), []
+        for f, reads, outputs in log:
+            if not reads & dirty:
+                continue
+            replayed = frozen >> f
+            if overridden := [k for k in replayed.returned if k not in outputs]:
+                # Assigned (or deleted) since the function was applied.
+                data = replayed.data.copy()
+                for k in overridden:
+                    if k in frozen.data:
+                        data[k] = frozen.data[k]
+                    else:
+                        del data[k]
+                replayed = replayed.derive(data, overridden)
+            frozen = replayed
+            dirty.update(outputs)
+            invalidated.extend(k for k in outputs if k not in invalidated)
+        return frozen, invalidated
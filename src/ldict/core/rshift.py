@@ -37,9 +37,10 @@
 #  works or verbatim, obfuscated, compiled or rewritten versions of any
 #  part of this work is illegal and unethical regarding the effort and
 #  time spent here.
+from functools import lru_cache
 from inspect import signature
 from types import FunctionType
-from typing import Union
+from typing import Union, Dict
 
 from lange import AP, GP
 
@@ -51,9 +52,13 @@ from ldict.core.inspection import (
 )
 from ldict.core.inspection import extract_input
 from ldict.exception import InconsistentLange, UndefinedSeed, DependenceException
-from ldict.lazyval import LazyVal
+from ldict.history import History
+from ldict.lazyval import LazyVal, GroupLock
 from ldict.parameter.let import AbstractLet
 
+EXECUTION_KEYS = ["input", "output", "function", "broadcast"]
+"""Metadata keys describing how to call a function; they are not recorded in '_history'"""
+
 
 def handle_dict(data, dictlike, rnd):
     """
@@ -64,9 +69,17 @@ def handle_dict(data, dictlike, rnd):
     {'x': 5, 'z': 8}
     >>> handle_dict(di, {"w":lambda x,z: x**z}, None)
     {'x': 5, 'z': 8, 'w': →(x z)}
+    >>> handle_dict(di, [("x", None), ("x", 3)], None)  # Pairs are applied in order.
+    {'z': 8, 'x': 3}
     """
     data = data.copy()
-    for k, v in dictlike.items():
+    assign(data, dictlike, rnd)
+    return data
+
+
+def assign(data, dictlike, rnd):
+    """Apply the pairs of 'dictlike' to 'data' in place: None deletes, callables are lazified"""
+    for k, v in dictlike.items() if isinstance(dictlike, Dict) else dictlike:
         if v is None:
             del data[k]
         else:
@@ -79,7 +92,6 @@ def handle_dict(data, dictlike, rnd):
                 data[k] = v.frozen
             else:
                 data[k] = v
-    return data
 
 
 def lazify(data, output_field: Union[list, str], f, rnd, is_multi_output) -> Union[dict, LazyVal]:
@@ -165,8 +177,10 @@ def lazify(data, output_field: Union[list, str], f, rnd, is_multi_output) -> Uni
     }
     """
     # TODO (minor): simplify to improve readability of this function
-    config, f = (f.config, f.f) if isinstance(f, AbstractLet) else ({}, f)
+    let = f if isinstance(f, AbstractLet) else None
+    config, f = (let.config, let.f) if let else ({}, f)
     input_fields, parameters, optional = extract_input(f)
+    parameters.pop("_cancel", None)  # Given at evaluation; see 'ldict.cancel'.
     noop = False
     if "_" in input_fields:
         noop = True
@@ -175,15 +189,17 @@ def lazify(data, output_field: Union[list, str], f, rnd, is_multi_output) -> Uni
             raise Exception("Cannot let parameters have values for a noop function")
     for k, v in config.items():
         parameters[k] = v
-    if isinstance(f, FunctionType):
+    declared = hasattr(f, "metadata") and "input" in f.metadata and "output" in f.metadata
+    if isinstance(f, FunctionType) and not (declared and "dynamic" in f.metadata["input"]):
         try:
             body = extract_body(f)
         except CodeExtractionException as e:
             body = f"<{e}>"
         dynamic_input = extract_dynamic_input("".join(body))
     else:
+        # Declared input (including dynamic fields) and output, e.g., by '@step': the code is read only for '_code'.
         body = None
-        if not (hasattr(f, "metadata") and "input" in f.metadata and "output" in f.metadata):  # pragma: no cover
+        if not declared:  # pragma: no cover
             raise Exception(f"Missing 'metadata' containing 'input' and 'output' keys for custom callable '{type(f)}'")
         dynamic_input = []
     dynamic_output = []
@@ -212,18 +228,21 @@ def lazify(data, output_field: Union[list, str], f, rnd, is_multi_output) -> Uni
             input_fields[parameters[par]] = None
 
     dynio = multidynamicinput | set(dynamic_output)
-    deps = prepare_deps(data, input_fields, parameters, rnd, dynio, optional)
+    deps = prepare_deps(data, input_fields, parameters, rnd, dynio, optional, f)
     for k, v in parameters.items():
         parameters[k] = deps[k]
+    fun = let.function(f) if let else f
     if noop:
 
         def la(**deps_out):
-            f(**deps_out)
+            fun(**deps_out)
             return deps_out
 
-        lazies = []
+        la.__wrapped__ = fun
+
+        lazies, lock = [], GroupLock()
         # REMINDER: noop uses input fields as output
-        dic = {k: LazyVal(k, la, deps, data, lazies) for k in input_fields}
+        dic = {k: LazyVal(k, la, deps, data, lazies, lock) for k in input_fields}
         lazies.extend(dic.values())
         deps["_"] = None
         return dic
@@ -235,10 +254,12 @@ def lazify(data, output_field: Union[list, str], f, rnd, is_multi_output) -> Uni
             newidx = step.pop("id")
             if "_" in newidx:  # pragma: no cover
                 raise Exception(f"'id' cannot have '_': {newidx}")
-        for k in ["input", "output", "function"]:
+        for k in EXECUTION_KEYS:
             if k in step:
                 del step[k]
         if "code" in f.metadata and f.metadata["code"] is ...:
+            if body is None and isinstance(f, FunctionType):
+                body = extract_body(f)
             if body is None:  # pragma: no cover
                 raise Exception(f"Cannot autofill 'metadata.code' for custom callable '{type(f)}'")
             head = f"def f{str(signature(f))}:"
@@ -261,14 +282,16 @@ def lazify(data, output_field: Union[list, str], f, rnd, is_multi_output) -> Uni
         step = {}
     if output_field == "extract":
         explicit, meta, meta_ellipsed = extract_output(f, body, deps, is_multi_output, dynamic_output)
-        lazies = []
-        dic = {k: LazyVal(k, f, deps, data, lazies) for k in explicit + meta}
+        lazies, lock = [], GroupLock()
+        dic = {k: LazyVal(k, fun, deps, data, lazies, lock) for k in explicit + meta}
         lazies.extend(dic.values())
         for metaf in meta_ellipsed:
             if metaf == "_code":
                 if hasattr(f, "metadata") and "code" in f.metadata:
                     dic["_code"] = f.metadata["code"]
                 else:
+                    if body is None and isinstance(f, FunctionType):
+                        body = extract_body(f)
                     if body is None:  # pragma: no cover
                         raise Exception(f"Missing 'metadata' containing 'code' key for custom callable '{type(f)}'")
                     head = f"def f{str(signature(f))}:"
@@ -289,28 +312,29 @@ def lazify(data, output_field: Union[list, str], f, rnd, is_multi_output) -> Uni
                 if "_history" in data:
                     if isinstance(data["_history"], LazyVal):
                         data["_history"] = data["_history"]()
-                    last = list(data["_history"].keys())[-1]
-                    if isinstance(last, int):
-                        newidx = last + 1
+                    history = History.of(data["_history"])
+                    if isinstance(history.last, int):
+                        newidx = history.last + 1
                     elif newidx == 0:
                         newidx = ...
-                    dic["_history"] = data["_history"].copy()
                 else:
-                    dic["_history"] = {}
-                dic["_history"][newidx] = step
+                    history = History()
+                # Linked to the upstream history, which is shared instead of copied.
+                dic["_history"] = history.append(newidx, step)
             else:  # pragma: no cover
                 raise Exception(f"'...' is not defined for '{metaf}'.")
         return dic
     else:
-        return LazyVal(output_field, f, deps, data, None)
+        return LazyVal(output_field, fun, deps, data, None)
 
 
-def prepare_deps(data, input, parameters, rnd, multi, optional):
+def prepare_deps(data, input, parameters, rnd, multi, optional, f=None):
     """Build a dict containing all needed dependencies (values) to apply a function:
         input fields and parameters.
 
     Parameter values are given in let() or sampled according to a range using a random number generator that provides a 'choice' method.
     A range is specified as the default value of the parameter in the function signature.
+    Generators that provide a 'draw' method (e.g., 'Streams') are given the function 'f' and the parameter name.
     """
     deps = {}
     for k, v in parameters.items():
@@ -328,7 +352,7 @@ def prepare_deps(data, input, parameters, rnd, multi, optional):
                     f"Another possible cause: Multidynamic output cannot be detected by now, "
                     f"please declare multidynamic output at f.metadata['output']"
                 )
-            deps[k] = rnd.choice(expand(v))
+            deps[k] = rnd.draw(f, k, sequence(v)) if hasattr(rnd, "draw") else rnd.choice(sequence(v))
         elif v is None:
             raise DependenceException(f"'None' value for parameter '{k}'.", deps.keys())
         else:
@@ -360,7 +384,36 @@ def expand(lst):
     -------
 
     """
-    return list(list2progression(lst)) if Ellipsis in lst else lst
+    return list(sequence(lst)) if Ellipsis in lst else lst
+
+
+def sequence(lst):
+    """Values of a parameter range as a sequence, without materializing A. or G. progressions
+
+    Progressions have O(1) 'len' and indexing, so 'Random.choice' draws the same values as it would from the list.
+    Parsed progressions are cached per range specification.
+
+    >>> from random import Random
+    >>> sequence([1,2,3,...,10_000_000])
+    [1 2 .+. 10000000]
+    >>> sequence([1,2,4,...,20]) is sequence([1,2,4,...,20])
+    True
+    >>> [Random(i).choice(sequence([1,2,4,...,2**30])) == Random(i).choice(expand([1,2,4,...,2**30])) for i in range(5)]
+    [True, True, True, True, True]
+    >>> sequence([1, 5, 3])
+    [1, 5, 3]
+    """
+    if Ellipsis not in lst:
+        return lst
+    try:
+        return progression(tuple(lst))
+    except TypeError:  # pragma: no cover
+        return list2progression(lst)
+
+
+@lru_cache(maxsize=1024)
+def progression(spec):
+    return list2progression(list(spec))
 
 
 def list2progression(lst):
@@ -19,8 +19,11 @@
 #  works or verbatim, obfuscated, compiled or rewritten versions of any
 #  part of this work is illegal and unethical regarding the effort and
 #  time spent here.
+from itertools import islice
 from json import JSONEncoder
 
+from ldict.core.base import AbstractLazyDict
+
 
 class CustomJSONEncoder(JSONEncoder):
     """
@@ -69,6 +72,10 @@ class CustomJSONEncoder(JSONEncoder):
     """
 
     width = None
+    max_items = 100
+    """Arrays, series and frames larger than this are summarized as shape/dtype/head."""
+    max_fields = 50
+    """Items shown per (nested) dict, ldict, list or tuple before pagination."""
 
     def default(self, obj):
         if obj is not None:
@@ -78,22 +85,15 @@ class CustomJSONEncoder(JSONEncoder):
             if obj is Ellipsis:
                 return "..."
             if isinstance(obj, FrozenLazyDict):
-                return self.data
+                return obj.data
             if isinstance(obj, LazyVal):
                 return str(obj)
             # if isinstance(obj, FunctionType):
             #     return str(obj)
             if not isinstance(obj, (list, set, str, int, float, bytearray, bool)):
                 try:
-                    from pandas.core.frame import DataFrame, Series
-
-                    if isinstance(obj, (DataFrame, Series)):
-                        # «str()» is to avoid nested identation
-                        return truncate("«" + str(obj.to_dict()) + "»", self.width)
-                    from numpy import ndarray
-
-                    if isinstance(obj, ndarray):
-                        return truncate("«" + str(obj).replace("\n", "") + "»", self.width)
+                    if (txt := summarize(obj, self.width, self.max_items)) is not None:
+                        return txt
                 except ImportError:  # pragma: no cover
                     print("Pandas or numpy may be missing.")
                 if hasattr(obj, "asdict"):
@@ -118,3 +118,89 @@ class CustomJSONEncoder(JSONEncoder):
 
 def truncate(txt, width):
     return txt[:width] + "..." if width and len(txt) > width else txt
+
+
+def summarize(obj, width=None, max_items=100, head=3):
+    """Textual representation of arrays, series and frames with cost bounded by 'max_items'
+
+    Small objects are fully rendered. Larger ones are described by shape, dtype and their first rows/items.
+    Return None for other types.
+
+    >>> from numpy import arange
+    >>> summarize(arange(3))
+    '«[0 1 2]»'
+    >>> summarize(arange(10_000_000).reshape(-1, 2))
+    '«ndarray(shape=(5000000, 2), dtype=int64) [0 1 2 ...]»'
+    >>> from pandas import DataFrame
+    >>> summarize(DataFrame({"a": range(1000), "b": 0.5}))
+    "«DataFrame(shape=(1000, 2), dtypes={'a': int64, 'b': float64}) head={'a': {0: 0, 1: 1, 2: 2}, 'b': {0: 0.5, 1: 0.5, 2: 0.5}}»"
+    >>> summarize(DataFrame({"a": range(1000)}).a)
+    '«Series(shape=(1000,), dtype=int64) head={0: 0, 1: 1, 2: 2}»'
+    >>> summarize(5) is None
+    True
+    """
+    from numpy import ndarray
+
+    if isinstance(obj, ndarray):
+        if obj.size <= max_items:
+            return truncate("«" + str(obj).replace("\n", "") + "»", width)
+        items = str(obj.flat[:head])[:-1]
+        return truncate(f"«ndarray(shape={obj.shape}, dtype={obj.dtype}) {items} ...]»", width)
+
+    from pandas.core.frame import DataFrame, Series
+
+    if isinstance(obj, (DataFrame, Series)):
+        if obj.size <= max_items:
+            # «str()» is to avoid nested identation
+            return truncate("«" + str(obj.to_dict()) + "»", width)
+        if isinstance(obj, DataFrame):
+            cols = obj.columns[:head]
+            dtypes = "{" + ", ".join(f"{c!r}: {t}" for c, t in obj.dtypes.iloc[:head].items())
+            dtypes += ", ...}" if len(obj.columns) > head else "}"
+            rows = obj.iloc[:head][cols].to_dict()
+            return truncate(f"«DataFrame(shape={obj.shape}, dtypes={dtypes}) head={rows}»", width)
+        return truncate(f"«Series(shape={obj.shape}, dtype={obj.dtype}) head={obj.iloc[:head].to_dict()}»", width)
+
+
+def preview(data, limit):
+    """Copy of the displayable part of a (possibly nested) dict-like, without evaluating lazy values
+
+    At most 'limit' items are kept per (nested) dict, ldict, list or tuple.
+    The omitted ones are counted by a marker '… N more': an item of lists, or a key (with value '…') of dicts.
+    Return also whether the display is final, i.e., whether it cannot change anymore:
+    every displayed value is an immutable scalar, a tuple of them, or an evaluated frozen ldict.
+
+    >>> from ldict.frozenlazydict import FrozenLazyDict
+    >>> d = FrozenLazyDict(x=2) >> (lambda x: {"y": x * 3})
+    >>> preview({"d": d, "z": list(range(5))}, 3)
+    ({'d': {'x': 2, 'y': →(x)}, 'z': [0, 1, 2, '… 2 more']}, False)
+    >>> preview(FrozenLazyDict({f"k{i}": i for i in range(5)}), 2)
+    ({'k0': 0, 'k1': 1, '… 3 more': '…'}, True)
+    >>> preview({"t": (1, "a")}, 2)  # A mutable dict is not final.
+    ({'t': [1, 'a']}, False)
+    """
+    from ldict.frozenlazydict import FrozenLazyDict
+    from ldict.history import History
+
+    final = isinstance(data, (str, int, float, complex, bool, bytes, type(None), type(Ellipsis)))
+    if isinstance(data, (AbstractLazyDict, dict, History)):
+        final = isinstance(data, FrozenLazyDict)
+        items = data.data if isinstance(data, AbstractLazyDict) else data.asdict if isinstance(data, History) else data
+        dic = {}
+        for k, v in islice(items.items(), limit):
+            dic[k], complete = preview(v, limit)
+            final = final and complete
+        if len(items) > limit:
+            dic[f"… {len(items) - limit} more"] = "…"
+        return dic, final
+    if isinstance(data, (list, tuple)):
+        final = isinstance(data, tuple)
+        lst = []
+        for v in islice(data, limit):
+            v, complete = preview(v, limit)
+            lst.append(v)
+            final = final and complete
+        if len(data) > limit:
+            lst.append(f"… {len(data) - limit} more")
+        return lst, final
+    return data, final
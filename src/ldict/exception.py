@@ -115,3 +115,7 @@ class UndefinedSeed(Exception):
 
 class ReadOnlyLdict(Exception):
     pass
+
+
+class Cancelled(Exception):
+    pass
@@ -0,0 +1,233 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+"""Fingerprints: short digests identifying the content of values and the provenance of lazy values
+
+A value given to an ldict is identified by its content ('content_hash').
+A value produced by a function is identified by the function ('function_hash': its code and the values it
+depends on besides its arguments) and the fingerprints of its dependencies ('structural_hash'), before and
+after evaluation: nothing is evaluated to fingerprint it.
+Values are assumed not to be modified in place; NumPy/pandas digests are cached per object.
+Digests of values that cannot be serialized depend on their address: they start with 'UNSTABLE', and
+comparisons fall back to comparing values (see 'FrozenLazyDict.__eq__').
+"""
+import sys
+from hashlib import blake2b
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from weakref import ref
+
+UNSTABLE = "~"
+"""Prefix of digests identifying a value only by its address, i.e., not by its content"""
+
+_cache = {}
+"""Digests of (weak-referenceable) arrays and frames by object id; entries leave along with their objects"""
+
+
+def content_hash(value):
+    """
+    >>> content_hash([1, "a"]) == content_hash([1, "a"]), content_hash(1) == content_hash(True)
+    (True, False)
+    >>> import numpy as np
+    >>> content_hash(np.arange(3)) == content_hash(np.array([0, 1, 2])), content_hash(np.arange(3)) == content_hash(np.arange(3.))
+    (True, False)
+    """
+    h = blake2b(digest_size=20)
+    return digest(h, update(h, value))
+
+
+def function_hash(f, use_id=True):
+    """Digest of a function: its code and what else it reads, i.e., captured values, global names and attributes
+
+    Functions that wrap ('__wrapped__') others include them; callable objects include their attributes.
+    A declared 'metadata["id"]' stands for all of it, unless 'use_id' is False.
+
+    >>> def make(k):
+    ...     return lambda x: x * k
+    >>> function_hash(make(2)) == function_hash(make(2)), function_hash(make(2)) == function_hash(make(3))
+    (True, False)
+    >>> class Model:
+    ...     def __init__(self, a):
+    ...         self.a = a
+    ...     def __call__(self, x):
+    ...         return {"y": x * self.a}
+    >>> function_hash(Model(2)) == function_hash(Model(2)), function_hash(Model(2)) == function_hash(Model(3))
+    (True, False)
+    """
+    h = blake2b(b"function", digest_size=20)
+    return digest(h, update_function(h, f, use_id, set()))
+
+
+def structural_hash(lazy):
+    """Digest of the function, the output field and the fingerprints of the dependencies of a lazy value
+
+    >>> from ldict.lazyval import LazyVal
+    >>> f = lambda x: x + 1
+    >>> a, b = LazyVal("y", f, {"x": 1}, {}, None), LazyVal("y", lambda x: x + 1, {"x": 1}, {}, None)
+    >>> structural_hash(a) == structural_hash(b), structural_hash(a) == structural_hash(LazyVal("z", f, {"x": 1}, {}, None))
+    (True, False)
+    """
+    from ldict.lazyval import LazyVal
+
+    h = blake2b(b"lazy", digest_size=20)
+    fingerprints = [function_hash(lazy.f)]
+    h.update(f"{fingerprints[0]}\0{lazy.field}".encode())
+    for k in sorted(lazy.deps):
+        v = lazy.upstream.get(k, lazy.deps[k])
+        fingerprints.append(v.fingerprint if isinstance(v, LazyVal) else content_hash(v))
+        h.update(f"\0{k}\0{fingerprints[-1]}".encode())
+    return digest(h, not any(map(unstable, fingerprints)))
+
+
+def unstable(fingerprint):
+    return fingerprint.startswith(UNSTABLE)
+
+
+def digest(h, stable):
+    return h.hexdigest() if stable else UNSTABLE + h.hexdigest()
+
+
+def update(h, value, seen=None):
+    """Feed the content of 'value' to 'h'; return whether it was identified by content (not by address)"""
+    from ldict.core.base import AbstractLazyDict
+
+    stable = True
+    if isinstance(value, AbstractLazyDict):
+        h.update(b"ldict" + value.fingerprint.encode())
+        stable = not unstable(value.fingerprint)
+    elif value is None or value is ... or isinstance(value, (bool, int, float, complex, str, bytes)):
+        h.update(f"{type(value).__name__}:{value!r}".encode())
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}:{len(value)}".encode())
+        for v in value:
+            stable = update(h, v, seen) and stable
+    elif isinstance(value, dict) or hasattr(value, "asdict") and isinstance(value.asdict, dict):
+        dic = value if isinstance(value, dict) else value.asdict
+        h.update(f"dict:{len(dic)}".encode())
+        for k in sorted(dic, key=repr):  # Dict equality does not depend on order.
+            stable = update(h, k, seen) and stable
+            stable = update(h, dic[k], seen) and stable
+    elif isinstance(value, (FunctionType, MethodType)):
+        stable = update_function(h, value, True, set() if seen is None else seen)
+    elif isinstance(value, (ModuleType, type, BuiltinFunctionType)):
+        name = getattr(value, "__qualname__", value.__name__)  # Identified by name, as pickle does.
+        h.update(f"{type(value).__name__}:{getattr(value, '__module__', None)}.{name}".encode())
+    elif (d := cached(value)) is not None:
+        h.update(d)
+    else:
+        try:
+            import dill
+
+            h.update(b"pickle" + dill.dumps(value, protocol=5))
+        except Exception:
+            # Not serializable: only equal to itself.
+            h.update(f"{type(value).__qualname__}@{id(value)}".encode())
+            stable = False
+    return stable
+
+
+def update_function(h, f, use_id, seen):
+    from ldict.core.inspection import code_digest
+
+    metadata = getattr(f, "metadata", None)
+    if use_id and isinstance(metadata, dict) and "id" in metadata:
+        h.update(f"id:{metadata['id']}".encode())
+        return True
+    if id(f) in seen:  # Recursion.
+        h.update(b"seen")
+        return True
+    seen.add(id(f))
+    stable = True
+    if isinstance(f, MethodType):
+        stable = update(h, f.__self__, seen) and update_function(h, f.__func__, use_id, seen)
+    elif (code := getattr(f, "__code__", None)) is not None:
+        h.update(code_digest(code).encode())
+        for cell in getattr(f, "__closure__", None) or ():
+            try:
+                contents = cell.cell_contents
+            except ValueError:  # Empty cell.
+                h.update(b"empty")
+                continue
+            stable = update(h, contents, seen) and stable
+        namespace = getattr(f, "__globals__", {})
+        for name in global_names(code):
+            if name in namespace:
+                h.update(f"\0{name}".encode())
+                stable = update(h, namespace[name], seen) and stable
+    else:  # Callable object: the code of its class and its attributes.
+        h.update(f"{type(f).__module__}.{type(f).__qualname__}".encode())
+        if isinstance(call := getattr(type(f), "__call__", None), FunctionType):
+            stable = update_function(h, call, use_id, seen)
+        state = {k: v for k, v in getattr(f, "__dict__", {}).items() if k not in ("metadata", "pickle_dump")}
+        stable = update(h, state, seen) and stable
+    if (wrapped := getattr(f, "__wrapped__", None)) is not None:
+        stable = update_function(h, wrapped, use_id, seen) and stable
+    return stable
+
+
+def global_names(code):
+    """Names that the code of a function (including nested functions) may read from its module"""
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if hasattr(const, "co_names"):
+            names.extend(n for n in global_names(const) if n not in names)
+    return names
+
+
+def cached(value):
+    """Digest of a NumPy array/scalar or pandas object, or None for other types"""
+    if "numpy" not in sys.modules:
+        return None
+    import numpy
+
+    if isinstance(value, numpy.ndarray) and not value.dtype.hasobject or isinstance(value, numpy.generic):
+        compute = array_digest
+    elif "pandas" in sys.modules and isinstance(value, (sys.modules["pandas"].Series, sys.modules["pandas"].DataFrame)):
+        compute = frame_digest
+    else:
+        return None
+    if isinstance(value, numpy.generic):
+        return compute(value)
+    key = id(value)
+    if (entry := _cache.get(key)) is not None and entry[0]() is value:
+        return entry[1]
+    d = compute(value)
+    _cache[key] = ref(value, lambda _, key=key: _cache.pop(key, None)), d
+    return d
+
+
+def array_digest(a):
+    import numpy
+
+    h = blake2b(f"ndarray:{a.dtype.str}:{a.shape}".encode(), digest_size=20)
+    h.update(numpy.ascontiguousarray(a).data)
+    return h.digest()
+
+
+def frame_digest(df):
+    from pandas.util import hash_pandas_object
+
+    h = blake2b(f"{type(df).__name__}:{df.shape}".encode(), digest_size=20)
+    if df.ndim == 2:
+        h.update(repr((list(df.columns), list(df.dtypes.astype(str)))).encode())
+    else:
+        h.update(repr((df.name, str(df.dtype))).encode())
+    h.update(hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.digest()
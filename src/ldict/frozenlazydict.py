@@ -23,17 +23,22 @@
 import json
 import operator
 from functools import reduce, cached_property
+from hashlib import blake2b
 from random import Random
 from typing import Dict, TypeVar, Union, Callable
 
+from ldict.checkpoint import Checkpoint
 from ldict.core.appearance import decolorize
 
 from ldict.core.base import AbstractLazyDict
-from ldict.core.rshift import handle_dict, lazify
-from ldict.customjson import CustomJSONEncoder
+from ldict.core.overlay import Overlay
+from ldict.core.rshift import assign, handle_dict, lazify
+from ldict.customjson import CustomJSONEncoder, preview
 from ldict.exception import WrongKeyType, ReadOnlyLdict
+from ldict.fingerprint import content_hash, digest, unstable
 from ldict.lazyval import LazyVal
 from ldict.parameter.functionspace import FunctionSpace
+from ldict.prefetch import Prefetcher
 from ldict.parameter.let import AbstractLet
 
 VT = TypeVar("VT")
@@ -93,12 +98,94 @@ class FrozenLazyDict(AbstractLazyDict):
     }
     """
 
+    prefetcher = None
+    """Background evaluation of lazy values created from this ldict onwards; see 'ldict.prefetch'"""
+    checkpoint = None
+    """Storage of the results of lazy values created from this ldict onwards; see 'ldict.checkpoint'"""
+
     # noinspection PyMissingConstructor
-    def __init__(self, /, _dictionary=None, rnd=None, _returned=None, **kwargs):
+    def __init__(self, /, _dictionary=None, rnd=None, _returned=None, _origins=None, **kwargs):
         self.rnd = rnd
         self.returned = _returned
-        self.data = _dictionary or {}
-        self.data.update(kwargs)
+        self._repr = None
+        self._fingerprint, self._fingerprints = None, {}
+        if isinstance(_dictionary, Overlay):  # Result of a chain of '>>', copied on first use.
+            self._overlay, self._data, self._origin_map = _dictionary, None, None
+            return
+        self._overlay = None
+        self._data = _dictionary or {}
+        self._data.update(kwargs)
+        # Lazy values by field, kept after evaluation (when 'data' holds their results) to fingerprint them.
+        self._origin_map = {k: v for k, v in self._data.items() if isinstance(v, LazyVal)} if _origins is None else _origins
+
+    @property
+    def data(self):
+        if self._overlay is not None:
+            self.materialize()
+        return self._data
+
+    @property
+    def _origins(self):
+        if self._overlay is not None:
+            self.materialize()
+        return self._origin_map
+
+    def materialize(self):
+        """Copy the fields pending from a chain of '>>' steps into a dict, once
+
+        Dicts and functions applied in sequence extend an 'Overlay' of the first ldict instead of each copying it.
+
+        >>> d = FrozenLazyDict(x=1) >> {"a": 1, "x": None} >> (lambda a: {"b": a + 1}) >> {"x": 3}
+        >>> d._overlay is not None
+        True
+        >>> d
+        {
+            "a": 1,
+            "b": "→(a)",
+            "x": 3
+        }
+        >>> d._overlay is None
+        True
+        """
+        if (overlay := self._overlay) is not None:
+            self._data, self._origin_map = overlay.copy(), overlay.copy_origins()
+            self._overlay = None
+
+    def extend(self):
+        """Overlay for the next step of a chain"""
+        if self._overlay is not None:
+            return self._overlay.extend()
+        return Overlay(self._data, self._origin_map)
+
+    def __reduce__(self):
+        """Pickling keeps lazy values lazy; NumPy buffers can be sent out-of-band with protocol 5.
+
+        >>> import pickle
+        >>> from numpy import arange
+        >>> d = FrozenLazyDict(x=arange(5)) >> (lambda x: {"y": x.sum()})
+        >>> buffers = []
+        >>> dump = pickle.dumps(d, protocol=5, buffer_callback=buffers.append)
+        >>> len(buffers)
+        1
+        >>> d2 = pickle.loads(dump, buffers=buffers)
+        >>> d2
+        {
+            "x": [0 1 2 3 4],
+            "y": "→(x)"
+        }
+        >>> d2.y
+        10
+        >>> d2.x.base is not None  # No copy: the array is a view of the received buffer.
+        True
+        """
+        # Evaluated origins travel only if already fingerprinted (otherwise, their dependencies would be needed).
+        origins = {k: v for k, v in self._origins.items() if v.result is None or v._fingerprint is not None}
+        state = {"_data": self.data, "rnd": self.rnd, "returned": self.returned, "_origin_map": origins}
+        return self.__class__.__new__, (self.__class__,), state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _overlay=None, _repr=None, _fingerprint=None, _fingerprints={})
+        self.__dict__.setdefault("_origin_map", {})
 
     def __getitem__(self, item):
         if not isinstance(item, str):
@@ -121,8 +208,27 @@ class FrozenLazyDict(AbstractLazyDict):
         return self.__getattribute__(item)
 
     def __repr__(self):
-        txt = json.dumps(self.data, indent=4, ensure_ascii=False, cls=CustomJSONEncoder)
-        return txt.replace('"«', "").replace('»"', "")
+        """Display cost is bounded by what is displayed: see 'CustomJSONEncoder.max_fields/max_items'.
+
+        Lazy values are not evaluated. The text is cached once it cannot change anymore (see 'preview').
+
+        >>> d = FrozenLazyDict({f"x{i}": i for i in range(100_000)}) >> (lambda x0: {"y": x0 + 1})
+        >>> print(str(d)[:40])
+        {
+            "x0": 0,
+            "x1": 1,
+            "x2": 2,
+        >>> str(d).splitlines()[-2:]
+        ['    "… 99951 more": "…"', '}']
+        """
+        if self._repr is not None:
+            return self._repr
+        data, final = preview(self, CustomJSONEncoder.max_fields)
+        txt = json.dumps(data, indent=4, ensure_ascii=False, cls=CustomJSONEncoder)
+        txt = txt.replace('"«', "").replace('»"', "")
+        if final:
+            self._repr = txt
+        return txt
 
     def __str__(self):
         return decolorize(repr(self))
@@ -141,9 +247,22 @@ class FrozenLazyDict(AbstractLazyDict):
             dic[field] = v.asdict if isinstance(v, AbstractLazyDict) else v
         return dic
 
-    def clone(self, data=None, rnd=None, _returned=None):
+    def clone(self, data=None, rnd=None, _returned=None, _origins=None):
         """Same lazy content with (optional) new data or rnd object."""
-        return FrozenLazyDict(self.data if data is None else data, rnd=rnd or self.rnd, _returned=_returned)
+        if data is None:  # Pending chains are shared as well.
+            data, _origins = (self._overlay, None) if self._overlay is not None else (self._data, self._origin_map)
+        clone = FrozenLazyDict(data, rnd=rnd or self.rnd, _returned=_returned, _origins=_origins)
+        clone.prefetcher, clone.checkpoint = self.prefetcher, self.checkpoint
+        return clone
+
+    def derive(self, data, keys):
+        """Clone with new 'data' in which only 'keys' may have been assigned or deleted"""
+        origins = self._origins.copy()
+        for k in keys:
+            origins.pop(k, None)
+            if isinstance(v := data.get(k), LazyVal):
+                origins[k] = v
+        return self.clone(data, _origins=origins)
 
     def __rrshift__(self, left: Union[Random, Dict, Callable, FunctionSpace]):
         """
@@ -172,27 +291,130 @@ class FrozenLazyDict(AbstractLazyDict):
         if isinstance(other, Random):
             return self.clone(rnd=other)
         if isinstance(other, FrozenLazyDict):
-            return self.clone(handle_dict(self.data, other, other.rnd), other.rnd)
+            origins = self._origins.copy()
+            for k in other:
+                origins.pop(k, None)
+            origins.update(other._origins)
+            return self.clone(handle_dict(self.data, other, other.rnd), other.rnd, _origins=origins)
         if isinstance(other, Dict):
-            return self.clone(handle_dict(self.data, other, self.rnd))
+            overlay = self.extend()
+            assign(overlay, other, self.rnd)
+            for k in other:
+                overlay.assigned[k] = v if isinstance(v := overlay.get(k), LazyVal) else None
+            return self.clone(overlay)
         if isinstance(other, FunctionSpace):
             return reduce(operator.rshift, (self,) + other.functions)
+        if isinstance(other, Prefetcher):
+            clone = self.clone()
+            clone.prefetcher = other
+            return clone
+        if isinstance(other, Checkpoint):
+            clone = self.clone()
+            clone.checkpoint = other
+            return clone
         if callable(other) or isinstance(other, AbstractLet):
-            lazies = lazify(self.data, output_field="extract", f=other, rnd=self.rnd, is_multi_output=True)
+            source = self._data if self._overlay is None else self._overlay
+            lazies = lazify(source, output_field="extract", f=other, rnd=self.rnd, is_multi_output=True)
             if lazies is None:
                 return self
-            data = self.data.copy()
-            data.update(lazies)
-            return self.clone(data, _returned=list(lazies.keys()))
+            overlay = self.extend()
+            overlay.update(lazies)
+            overlay.assigned.update((k, v) for k, v in lazies.items() if isinstance(v, LazyVal))
+            f = other.f if isinstance(other, AbstractLet) else other
+            if checkpoint := self.checkpoint or Checkpoint.of(f):
+                for v in lazies.values():
+                    if isinstance(v, LazyVal):
+                        v.checkpoint = checkpoint
+            if prefetcher := self.prefetcher or Prefetcher.of(f):
+                prefetcher.submit(v for v in lazies.values() if isinstance(v, LazyVal))
+            return self.clone(overlay, _returned=list(lazies.keys()))
         return NotImplemented
 
+    @property
+    def fingerprint(self):
+        """Digest of the fields and their fingerprints: content for given values, provenance for lazy ones
+
+        Nothing is evaluated, and the fingerprint does not change after evaluation; see 'ldict.fingerprint'.
+
+        >>> f = lambda x: {"y": x + 1}
+        >>> a, b = FrozenLazyDict(x=1) >> f, FrozenLazyDict(x=1) >> (lambda x: {"y": x + 1})
+        >>> fp = a.fingerprint
+        >>> a.y, a.fingerprint == fp == b.fingerprint, hash(a) == hash(b)
+        (2, True, True)
+        >>> FrozenLazyDict(x=1, y=2).fingerprint == fp  # Same values, but not the same provenance.
+        False
+        """
+        if self._fingerprint is None:
+            h, stable = blake2b(b"ldict", digest_size=20), True
+            for k in sorted(self.data):
+                h.update(f"\0{k}\0{(fp := self.field_fingerprint(k))}".encode())
+                stable = stable and not unstable(fp)
+            self._fingerprint = digest(h, stable)
+        return self._fingerprint
+
+    def field_fingerprint(self, key):
+        if (fp := self._fingerprints.get(key)) is None:
+            origin = self._origins.get(key)
+            fp = origin.fingerprint if origin is not None else content_hash(self.data[key])
+            self._fingerprints[key] = fp
+        return fp
+
+    def __hash__(self):
+        if unstable(fp := self.fingerprint):
+            raise TypeError("unhashable ldict: some value or function can only be identified by its address")
+        return int(fp[:16], 16)
+
     def __eq__(self, other):
+        """Compare fingerprints; plain dicts are compared by value, see 'equals'
+
+        Functions are told apart by the values they capture, the global names they read and their attributes.
+        Ldicts with a value (or function) that is identified only by its address are compared by value.
+
+        >>> import numpy as np
+        >>> f = lambda x: {"y": x * 2}
+        >>> a, b = FrozenLazyDict(x=np.arange(3)) >> f, FrozenLazyDict(x=np.arange(3)) >> f
+        >>> a == b
+        True
+        >>> b
+        {
+            "x": [0 1 2],
+            "y": "→(x)"
+        }
+        >>> a.equals(b), a.equals(FrozenLazyDict(x=np.arange(3), y=np.arange(0, 6, 2)))
+        (True, True)
+        >>> a == {"x": np.arange(3), "y": np.arange(0, 6, 2)}
+        True
+        >>> def make(k):
+        ...     return lambda x: {"y": x + k}
+        >>> FrozenLazyDict(x=1) >> make(1) == FrozenLazyDict(x=1) >> make(100)
+        False
+        """
         if self.keys() != other.keys():
             return False
-        self.evaluate()
         if isinstance(other, AbstractLazyDict):
-            other.evaluate()
-            return self.data == other.data
+            return self.equals(other, strict=False)
         if isinstance(other, Dict):
-            return self.data == other
+            return self.equals(other)
         raise TypeError(f"Cannot compare {type(self)} and {type(other)}")  # pragma: no cover
+
+    def equals(self, other, strict=True):
+        """Compare evaluated values ('strict') or fingerprints, unless they do not identify the content"""
+        if self.keys() != other.keys():
+            return False
+        if not strict and isinstance(other, AbstractLazyDict):
+            if not unstable(fp := self.fingerprint) and not unstable(other_fp := other.fingerprint):
+                return fp == other_fp
+        return all(equal(self[k], other[k]) for k in self)
+
+
+def equal(a, b):
+    """Value equality that also holds for NumPy arrays and pandas objects"""
+    if isinstance(a, AbstractLazyDict) and isinstance(b, (AbstractLazyDict, Dict)):
+        return a.equals(b)
+    if hasattr(a, "equals") and type(a) is type(b):  # pandas
+        return a.equals(b)
+    if hasattr(a, "__array__") or hasattr(b, "__array__"):
+        import numpy
+
+        return numpy.array_equal(a, b)
+    return a == b
@@ -0,0 +1,108 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from collections.abc import Mapping
+
+
+class History(Mapping):
+    """Persistent '_history': each step links to the history it extends, which is shared, not copied
+
+    Appending, membership and the last key are O(1). It reads as the dict that successive assignments
+    would build (a repeated key keeps its position and takes the newest step), materialized on first read.
+
+    >>> h0 = History()
+    >>> h1 = h0.append(0, {"name": "f"})
+    >>> h2 = h1.append("id-g", {"name": "g"})
+    >>> h3 = h2.append(0, {"name": "f2"})
+    >>> h3.last, len(h3), 0 in h3, "id-g" in h1
+    ('id-g', 2, True, False)
+    >>> h3
+    {0: {'name': 'f2'}, 'id-g': {'name': 'g'}}
+    >>> h1.append(1, {"name": "h"}) == {0: {"name": "f"}, 1: {"name": "h"}}  # Branching from an ancestor.
+    True
+    >>> h3.last, h1.last
+    ('id-g', 0)
+    """
+
+    def __init__(self, parent=None, key=None, step=None):
+        self.parent, self.key, self.step = parent, key, step
+        self._dict = None
+        if parent is None:
+            self.size, self.last, self.index = 0, None, {}
+        else:
+            self.size = parent.size + 1
+            new = key not in parent
+            self.last = key if new else parent.last
+            if parent.index is not None and parent.owner:
+                # The first child takes the index over: positions are recorded, so ancestors still see their part.
+                self.index, parent.owner = parent.index, False
+            else:
+                self.index = {k: i for k, i in parent.index.items() if i < parent.size}
+            if new:
+                self.index[key] = self.size - 1
+        self.owner = True
+
+    @classmethod
+    def of(cls, history):
+        """History equivalent to a (possibly plain) dict"""
+        if isinstance(history, History):
+            return history
+        h = cls()
+        for k, v in history.items():
+            h = h.append(k, v)
+        return h
+
+    def append(self, key, step):
+        return History(self, key, step)
+
+    def __contains__(self, key):
+        return self.index.get(key, self.size) < self.size
+
+    @property
+    def asdict(self):
+        if self._dict is None:
+            nodes, node = [], self
+            while node.parent is not None and node._dict is None:
+                nodes.append(node)
+                node = node.parent
+            dic = {} if node._dict is None else node._dict.copy()
+            for node in reversed(nodes):
+                dic[node.key] = node.step
+            self._dict = dic
+        return self._dict
+
+    def copy(self):
+        return self.asdict.copy()
+
+    def __getitem__(self, key):
+        return self.asdict[key]
+
+    def __iter__(self):
+        return iter(self.asdict)
+
+    def __len__(self):
+        return len(self.asdict)
+
+    def __repr__(self):
+        return repr(self.asdict)
+
+    def __reduce__(self):
+        return History.of, (self.asdict,)
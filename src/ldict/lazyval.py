@@ -19,6 +19,9 @@
 #  works or verbatim, obfuscated, compiled or rewritten versions of any
 #  part of this work is illegal and unethical regarding the effort and
 #  time spent here.
+from inspect import signature
+from threading import RLock
+from weakref import WeakKeyDictionary, ref
 
 
 class LazyVal:
@@ -39,32 +42,126 @@ class LazyVal:
     1
     >>> b
     2
+
+    Pending values survive pickling: the function is shipped through dill,
+    and shared dependencies/siblings/functions are stored only once per pickle.
+    Unpickled payloads do not share function objects (nor their state) with each other.
+    Values captured in a function closure travel inside its dill dump, i.e., they are not zero-copy.
+    >>> import pickle
+    >>> lazies = []
+    >>> c, d = LazyVal("y", f, deps, deps, lazies), LazyVal("z", f, deps, deps, lazies)
+    >>> lazies.extend([c, d])
+    >>> c2, d2 = pickle.loads(pickle.dumps([c, d]))
+    >>> c2.deps is d2.deps, c2.lazies is d2.lazies
+    (True, True)
+    >>> c2(), d2
+    (1, 2)
+    >>> c.result is None
+    True
+    >>> e, e2 = pickle.loads(pickle.dumps([c, d])), pickle.loads(pickle.dumps([c, d]))
+    >>> e[0].f is e[1].f, e[0].f is e2[0].f
+    (True, False)
+
+    Evaluation is thread-safe: siblings share a lock (given at creation), so their function runs only once.
+    It can be abandoned through a 'CancelToken' ('ldict.cancel'); the value is then left pending.
+
+    The fingerprint identifies the function and the dependencies; it does not change after evaluation.
+    >>> g = lambda l: l + 1
+    >>> c = LazyVal("y", g, {"l": LazyVal("l", g, {"l": 0}, {}, None)}, {}, None)
+    >>> fp = c.fingerprint
+    >>> e = LazyVal("y", g, {"l": LazyVal("l", g, {"l": 0}, {}, None)}, {}, None)
+    >>> c(), e(), c.fingerprint == fp == e.fingerprint
+    (2, 2, True)
     """
 
-    def __init__(self, field, f, deps, data, lazies):
+    checkpoint = None
+    """Where the result is restored from and stored to, if any; see 'ldict.checkpoint'"""
+
+    def __init__(self, field, f, deps, data, lazies, lock=None):
         self.field = field
         self.f = f
         self.deps = deps
         self.data = data
         self.lazies = lazies
+        self.lock = lock or GroupLock()
         self.result = None
+        self.upstream = {}
+        self._fingerprint = None
 
-    def __call__(self, *args, **kwargs):
+    def __call__(self, cancel=None):
         if self.result is None:
-            for k, v in self.deps.items():
-                if isinstance(v, LazyVal):
-                    self.deps[k] = v()
-                    if k in self.data:
-                        self.data[k] = self.deps[k]
-            ret = self.f(**self.deps)
-            if self.lazies is None:
-                self.result = ret
-            else:
-                self.result = ret[self.field]
-                for lazy in self.lazies:
-                    lazy.result = ret[lazy.field]
+            with self.lock:
+                if self.result is None:
+                    self.evaluate(cancel)
         return self.result
 
+    def evaluate(self, cancel=None):
+        if self.checkpoint is not None and self.checkpoint.restore(self):
+            return
+        self.resolve(cancel)
+        if cancel is not None:
+            cancel.check()
+        self.settle(ret := call(self.f, self.deps, cancel))
+        if self.checkpoint is not None:
+            self.checkpoint.store(self, ret)
+
+    def resolve(self, cancel=None):
+        """Replace lazy dependencies by their values"""
+        if upstream := {k: v for k, v in self.deps.items() if isinstance(v, LazyVal)}:
+            # Lazy dependencies are replaced by their values below; they still identify them.
+            for lazy in self.lazies or (self,):
+                lazy.upstream = upstream
+        for k, v in upstream.items():
+            if cancel is not None:
+                cancel.check()
+            self.deps[k] = v(cancel)
+            if self.data.get(k) is v:  # Still the input data of the function: it can hold the value.
+                self.data[k] = self.deps[k]
+
+    def settle(self, ret):
+        """Take the value returned by the function, for this value and its siblings"""
+        if self.lazies is None:
+            self.result = ret
+        else:
+            for lazy in self.lazies:
+                if lazy is not self:
+                    lazy.result = ret[lazy.field]
+            self.result = ret[self.field]
+
+    def __getstate__(self):
+        if self.result is None:
+            # The input dict is left behind: it is only needed to free memory after evaluation.
+            return {
+                "field": self.field,
+                "f": FunctionHandle.of(self.f),
+                "deps": self.deps,
+                "lazies": self.lazies,
+                "lock": self.lock,
+                "upstream": self.upstream,
+                "fingerprint": self._fingerprint,
+            }
+        return {"field": self.field, "result": self.result, "fingerprint": self._fingerprint}
+
+    def __setstate__(self, state):
+        self.field = state["field"]
+        self.f = state.get("f")
+        self.deps = state.get("deps", {})
+        self.data = {}
+        self.lazies = state.get("lazies")
+        self.lock = state.get("lock") or GroupLock()
+        self.result = state.get("result")
+        self.upstream = state.get("upstream", {})
+        self._fingerprint = state.get("fingerprint")
+
+    @property
+    def fingerprint(self):
+        """Structural digest; see 'ldict.fingerprint'"""
+        if self._fingerprint is None:
+            from ldict.fingerprint import structural_hash
+
+            self._fingerprint = structural_hash(self)
+        return self._fingerprint
+
     def __repr__(self):
         if self.result is None:
             dic = {}
@@ -72,3 +169,127 @@ class LazyVal:
                 dic[k] = v if isinstance(v, LazyVal) else ""
             return f"→({' '.join([f'{k}{v}' for k, v in dic.items()])})"
         return str(self.result)
+
+
+def call(f, kwargs, cancel):
+    """Apply 'f', in a child process if 'metadata["process"]', giving it the token if it has a '_cancel' parameter
+
+    Batch-capable functions ('metadata["batch"]') are called along with other pending calls; see 'ldict.batch'.
+    """
+    if (metadata := getattr(f, "metadata", None)) is None:
+        metadata = getattr(getattr(f, "__wrapped__", None), "metadata", {})
+    if metadata.get("batch"):
+        from ldict.batch import MicroBatcher
+
+        return MicroBatcher.of(f)(kwargs)
+    if metadata.get("process"):
+        return run_in_process(f, kwargs, cancel)
+    if cooperative(f):
+        from ldict.cancel import CancelToken
+
+        return f(**kwargs, _cancel=cancel or CancelToken())
+    return f(**kwargs)
+
+
+_cooperative = WeakKeyDictionary()
+
+
+def cooperative(f):
+    try:
+        if (accepts := _cooperative.get(f)) is None:
+            accepts = _cooperative[f] = "_cancel" in signature(f).parameters
+        return accepts
+    except TypeError:  # pragma: no cover
+        return "_cancel" in signature(f).parameters
+
+
+def run_in_process(f, kwargs, cancel):
+    """Apply 'f' in a child process, which is terminated if 'cancel' is set meanwhile"""
+    import dill
+    import multiprocessing
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=child, args=(dill.dumps((f, kwargs), protocol=5, recurse=True), sender))
+    process.start()
+    sender.close()
+    try:
+        while not receiver.poll(0.05):
+            if cancel is not None and cancel.cancelled:
+                process.terminate()
+                cancel.check()
+            if not process.is_alive() and not receiver.poll():
+                raise ChildProcessError(f"Step process exited with code {process.exitcode}.")
+        ok, value = dill.loads(receiver.recv_bytes())
+    finally:
+        process.join()
+        receiver.close()
+    if not ok:
+        raise value
+    return value
+
+
+def child(payload, sender):
+    import dill
+
+    try:
+        f, kwargs = dill.loads(payload)
+        sender.send_bytes(dill.dumps((True, f(**kwargs)), protocol=5))
+    except BaseException as e:
+        sender.send_bytes(dill.dumps((False, e), protocol=5))
+
+
+class GroupLock:
+    """Reentrant lock shared by sibling lazy values; it is pickled as a new lock (once per payload)"""
+
+    def __init__(self):
+        self.lock = RLock()
+
+    def __enter__(self):
+        return self.lock.__enter__()
+
+    def __exit__(self, *args):
+        return self.lock.__exit__(*args)
+
+    def __reduce__(self):
+        return GroupLock, ()
+
+
+class FunctionHandle:
+    """Pickle a function through dill
+
+    There is one handle per live function, so the pickle memo stores each function only once per payload.
+    The dump is taken at pickling time, so the current state of callable objects is shipped."""
+
+    handles = WeakKeyDictionary()
+
+    def __init__(self, f):
+        self.f = ref(f)
+
+    @classmethod
+    def of(cls, f):
+        try:
+            if (handle := cls.handles.get(f)) is None:
+                handle = cls.handles[f] = cls(f)
+            return handle
+        except TypeError:  # pragma: no cover
+            # Not weak-referenceable nor hashable: no deduplication.
+            return _Strong(f)
+
+    def __reduce__(self):
+        import dill
+
+        # 'recurse' avoids dragging the whole module namespace along with the function.
+        return load_function, (dill.dumps(self.f(), protocol=5, recurse=True),)
+
+
+class _Strong(FunctionHandle):
+    def __init__(self, f):
+        self.f = lambda: f
+
+
+def load_function(dump):
+    import dill
+
+    return dill.loads(dump)
@@ -39,6 +39,10 @@ class AbstractLet:
     def asdict(self):
         return self.config
 
+    def function(self, f):
+        """Callable that lazy values will call in place of 'f' (with the same arguments)"""
+        return f
+
     def __rrshift__(self, left: Union[Dict, Callable, "AbstractLet"]):
         """
         >>> from ldict import empty
@@ -0,0 +1,168 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from itertools import chain, product
+from queue import Queue, Full
+from random import Random
+from threading import Lock, Thread, Event
+
+from ldict.lazyval import LazyVal
+from ldict.parameter.functionspace import FunctionSpace
+from ldict.parameter.sampling import wrap
+
+
+def grid(d, fs, workers=None):
+    """Apply the function space 'fs' to 'd' once per combination of the values of its sampleable parameters
+
+    Sampleable parameters are the ones a 'Random' would draw (ranges in signatures or lists given to 'let').
+    Combinations form a trie, explored depth-first: each step is applied once per distinct prefix
+    (parent plus values drawn so far), so the lazy values of a prefix are shared and evaluated once.
+    Leaves are evaluated and yielded as '(parameters, leaf)', where 'parameters' holds one dict per step;
+    finished subtrees are dropped as the iteration advances.
+    With 'workers', subtrees of the first branching step are explored in that many threads
+    and leaves are yielded as they complete (not in order).
+    'Random' objects inside 'fs' are ignored.
+
+    >>> from ldict import ldict, let
+    >>> calls = []
+    >>> def prep(x, k=[1, 2]):
+    ...     calls.append(k)
+    ...     return {"y": x * k}
+    >>> f = lambda y, a=[10, 20, 30, ..., 40]: {"z": y + a}
+    >>> for parameters, leaf in ldict(x=1).grid(FunctionSpace(prep, let(f, a=[5, 6]))):
+    ...     print(parameters, leaf.z)
+    [{'k': 1}, {'a': 5}] 6
+    [{'k': 1}, {'a': 6}] 7
+    [{'k': 2}, {'a': 5}] 7
+    [{'k': 2}, {'a': 6}] 8
+    >>> calls
+    [1, 2]
+    >>> sorted(leaf.z for _, leaf in ldict(x=1).grid(FunctionSpace(prep, f), workers=2))
+    [11, 12, 21, 22, 31, 32, 41, 42]
+    """
+    from ldict.core.base import AbstractMutableLazyDict
+
+    steps = fs.functions if isinstance(fs, FunctionSpace) else fs if isinstance(fs, (list, tuple)) else (fs,)
+    steps = [step for step in steps if not isinstance(step, Random)]
+    start = d.frozen if isinstance(d, AbstractMutableLazyDict) else d
+    leaves = explore(start, steps, workers) if workers else trie(start, steps, 0, ())
+    for parameters, leaf in leaves:
+        leaf = leaf.__class__(leaf.data, rnd=start.rnd, _returned=leaf.returned)
+        yield list(parameters), wrap(d, leaf) if isinstance(d, AbstractMutableLazyDict) else leaf
+
+
+def trie(current, steps, i, parameters):
+    """Depth-first generator of evaluated leaves below 'current'"""
+    if i == len(steps):
+        current.evaluate()
+        yield parameters, current
+        return
+    for child, params in children(current, steps[i]):
+        yield from trie(child, steps, i + 1, parameters + (params,))
+
+
+def children(current, step):
+    """Results of applying 'step' to 'current' for each combination of values of its sampleable parameters"""
+    odometer = Odometer(())
+    first = current.clone(rnd=odometer) >> step
+    yield first, drawn(current, first)
+    for positions in product(*map(range, odometer.sizes)):
+        if any(positions):
+            child = current.clone(rnd=Odometer(positions)) >> step
+            yield child, drawn(current, child)
+
+
+def explore(start, steps, workers):
+    """Explore subtrees of the first branching step in parallel, yielding leaves as they complete"""
+    current, i, parameters = start, 0, ()
+    while i < len(steps):
+        level = children(current, steps[i])
+        first = next(level)
+        second = next(level, None)
+        i += 1
+        if second is not None:
+            level = chain([first, second], level)
+            break
+        current, parameters = first[0], parameters + (first[1],)
+    else:
+        yield from trie(current, steps, i, parameters)
+        return
+
+    queue, lock, stop, done = Queue(maxsize=2 * workers), Lock(), Event(), object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                return queue.put(item, timeout=0.1)
+            except Full:
+                pass
+
+    def work():
+        try:
+            while not stop.is_set():
+                with lock:
+                    if (nxt := next(level, None)) is None:
+                        break
+                child, params = nxt
+                for leaf in trie(child, steps, i, parameters + (params,)):
+                    put(leaf)
+        except BaseException as e:
+            put(e)
+        finally:
+            put(done)
+
+    threads = [Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        running = workers
+        while running:
+            item = queue.get()
+            if item is done:
+                running -= 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+
+
+class Odometer:
+    """Stand-in for 'Random' that picks the given positions (default: 0) and records the size of each sequence"""
+
+    def __init__(self, positions):
+        self.positions = positions
+        self.sizes = []
+
+    def choice(self, seq):
+        i = len(self.sizes)
+        self.sizes.append(len(seq))
+        return seq[self.positions[i] if i < len(self.positions) else 0]
+
+
+def drawn(parent, child):
+    """Parameter values of the lazy fields a step added to 'parent'"""
+    params = {}
+    for k, v in child.data.items():
+        if isinstance(v, LazyVal) and parent.data.get(k) is not v:
+            params.update((p, x) for p, x in v.deps.items() if p not in parent.data)
+    return params
@@ -0,0 +1,144 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from concurrent.futures import ThreadPoolExecutor
+
+from ldict.lazyval import LazyVal
+from ldict.parameter.functionspace import FunctionSpace
+from ldict.scheduler import Scheduler
+
+
+def sample(d, fs, n, rnd=None, workers=None):
+    """Apply the function space 'fs' to 'd' 'n' times, drawing parameters from 'rnd' (default: 'd.rnd')
+
+    Draws happen in the same order as in 'for _ in range(n): d >> rnd >> fs'.
+    With 'Streams', the j-th application uses 'rnd.variant(j)' instead (its draws are computed in vectorized blocks).
+    Each step is applied only once per distinct (parent, drawn parameters) pair,
+    so variants share every lazy value that does not depend on a sampled parameter,
+    and steps that draw nothing are not even reapplied.
+    Duplicate variants are skipped: the result holds distinct variants, in order of first appearance.
+    If 'workers' is given, the variants are evaluated in that many threads before returning,
+    or by it, if it is a 'Scheduler'.
+
+    >>> from random import Random
+    >>> from ldict import ldict
+    >>> calls = []
+    >>> def prep(x):
+    ...     calls.append(x)
+    ...     return {"y": x * 10}
+    >>> f = lambda y, a=[1, 2, 3]: {"z": y + a}
+    >>> fs = FunctionSpace(prep, f)
+    >>> variants = ldict(x=1).sample(fs, n=10, rnd=Random(0))
+    >>> variants
+    [{
+        "x": 1,
+        "y": "→(x)",
+        "z": "→(a y→(x))"
+    }, {
+        "x": 1,
+        "y": "→(x)",
+        "z": "→(a y→(x))"
+    }, {
+        "x": 1,
+        "y": "→(x)",
+        "z": "→(a y→(x))"
+    }]
+    >>> variants[0].data["y"] is variants[1].data["y"]
+    True
+    >>> [v.z for v in variants], calls
+    ([12, 11, 13], [1])
+    >>> rnd, d = Random(0), ldict(x=1)
+    >>> [(d >> rnd >> fs).z for _ in range(10)]
+    [12, 12, 11, 12, 13, 12, 12, 12, 12, 12]
+    >>> [v.z for v in ldict(x=2).sample(fs, n=10, rnd=Random(0), workers=4)]
+    [22, 21, 23]
+    >>> from ldict.parameter.streams import Streams
+    >>> variants = ldict(x=1).sample(fs, n=10, rnd=Streams(0))
+    >>> [v.z for v in variants] == list(dict.fromkeys(10 + a for a in Streams(0).batch(f, "a", [1, 2, 3], 10)))
+    True
+    """
+    from ldict.core.base import AbstractMutableLazyDict
+
+    steps = fs.functions if isinstance(fs, FunctionSpace) else fs if isinstance(fs, (list, tuple)) else (fs,)
+    start = d.frozen if isinstance(d, AbstractMutableLazyDict) else d
+    if rnd is not None:
+        start = start.clone(rnd=rnd)
+    memo, deterministic, variants = {}, set(), {}
+    streams = hasattr(start.rnd, "variant")
+    for j in range(n):
+        current = start
+        for i, step in enumerate(steps):
+            if i in deterministic and (i, id(current)) in memo:
+                current = memo[i, id(current)][1]
+                continue
+            before = state(current.rnd)
+            child = (current.clone(rnd=start.rnd.variant(j)) if streams else current) >> step
+            if child.rnd is current.rnd and before is not None and state(child.rnd) == before:
+                deterministic.add(i)
+                key = i, id(current)
+            else:
+                key = i, id(current), drawn(current, child)
+            # The parent is kept alive along with the child, so its id is not reused.
+            current = memo.setdefault(key, (current, child))[1]
+        variants.setdefault(id(current), current)
+    variants = list(variants.values())
+    if isinstance(workers, Scheduler):
+        workers.evaluate(variants)
+    elif workers is not None:
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(lambda v: v.evaluate(), variants))
+    if isinstance(d, AbstractMutableLazyDict):
+        return [wrap(d, v) for v in variants]
+    return variants
+
+
+def state(rnd):
+    # Draws from order-independent streams do not change their state.
+    return rnd.getstate() if hasattr(rnd, "getstate") and not hasattr(rnd, "draw") else None
+
+
+def drawn(parent, child):
+    """Hashable description of what a step added to 'parent': parameter values for lazy fields"""
+    key = []
+    for k, v in child.data.items():
+        if parent.data.get(k) is v:
+            continue
+        if isinstance(v, LazyVal):
+            key.append((k, tuple((p, token(x)) for p, x in v.deps.items() if p not in parent.data)))
+        else:
+            key.append((k, token(v)))
+    return tuple(key)
+
+
+def token(v):
+    if isinstance(v, (dict, list)):
+        return repr(v)
+    try:
+        hash(v)
+        return v
+    except TypeError:
+        return id(v)
+
+
+def wrap(d, frozen):
+    clone = d.__class__()
+    clone.frozen = frozen
+    return clone
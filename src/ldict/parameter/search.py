@@ -0,0 +1,180 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+"""Successive halving and Hyperband over the parameter space of a FunctionSpace
+
+Configurations are the parameter values drawn for each step. A configuration is trained at a rung
+by inserting the resource field (e.g., number of epochs) and evaluating only the score field (and what it needs).
+Step applications are memoized by (step, parameters, identity of its input values),
+so everything that does not depend on the resource is built and evaluated once for all rungs and brackets.
+"""
+import math
+from inspect import signature
+from random import Random
+
+from ldict.core.inspection import extract_input
+from ldict.parameter.abslet import AbstractLet
+from ldict.parameter.functionspace import FunctionSpace
+from ldict.parameter.grid import drawn
+from ldict.parameter.let import lLet
+from ldict.parameter.sampling import token
+
+
+def halving(d, fs, resource, score, n, min_resource, max_resource, eta=3, rnd=None, maximize=True, log=None):
+    """Successive halving: train 'n' sampled configurations with 'min_resource', keep the best 1/'eta', repeat
+
+    The resource grows by 'eta' per rung up to 'max_resource'.
+    Return '(parameters, leaf)' for the best configuration at the last rung, with one parameter dict per step.
+    Each trained configuration is appended to 'log' (if given) as '(resource, parameters, score)'.
+
+    >>> from ldict import ldict
+    >>> calls = []
+    >>> def prep(x):
+    ...     calls.append(x)
+    ...     return {"y": x * 2}
+    >>> def train(y, epochs, a=[1, 2, 3, ..., 9]):
+    ...     return {"score": y - abs(a - 5) * epochs}
+    >>> log = []
+    >>> parameters, leaf = halving(ldict(x=1), FunctionSpace(prep, train), "epochs", "score",
+    ...                            n=9, min_resource=1, max_resource=9, rnd=Random(0), log=log)
+    >>> parameters, leaf.score
+    ([{}, {'a': 5}], 2)
+    >>> [r for r, _, _ in log]
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 3, 3, 3, 9]
+    >>> calls  # The prefix is evaluated once for all configurations and rungs.
+    [1]
+    """
+    return Search(d, fs, resource, score, eta, rnd, maximize, log).halving(n, min_resource, max_resource)[:2]
+
+
+def hyperband(d, fs, resource, score, min_resource, max_resource, eta=3, rnd=None, maximize=True, log=None):
+    """Hyperband: successive halving brackets trading the number of configurations for their starting resource
+
+    Return '(parameters, leaf)' for the best configuration among all brackets; see 'halving'.
+
+    >>> from ldict import ldict
+    >>> train = lambda x, epochs, a=[1, 2, 3, ..., 9]: {"score": x - abs(a - 5) * epochs}
+    >>> log = []
+    >>> parameters, leaf = hyperband(ldict(x=1), train, "epochs", "score", 1, 9, rnd=Random(0), log=log)
+    >>> parameters, leaf.score
+    ([{'a': 5}], 1)
+    >>> len(log)
+    22
+    """
+    return Search(d, fs, resource, score, eta, rnd, maximize, log).hyperband(min_resource, max_resource)
+
+
+class Search:
+    def __init__(self, d, fs, resource, score, eta, rnd, maximize, log):
+        from ldict.core.base import AbstractMutableLazyDict
+
+        steps = fs.functions if isinstance(fs, FunctionSpace) else fs if isinstance(fs, (list, tuple)) else (fs,)
+        self.steps = [step for step in steps if not isinstance(step, Random)]
+        self.start = d.frozen if isinstance(d, AbstractMutableLazyDict) else d
+        self.rnd = rnd or self.start.rnd
+        self.resource, self.score, self.eta = resource, score, eta
+        self.maximize, self.log = maximize, log
+        self.memo, self.drawn = {}, 0
+
+    def hyperband(self, min_resource, max_resource):
+        smax = int(math.log(max_resource / min_resource, self.eta) + 1e-9)
+        best = None
+        for s in range(smax, -1, -1):
+            n = math.ceil((smax + 1) / (s + 1) * self.eta ** s)
+            r = max_resource / self.eta ** s
+            r = round(r) if isinstance(min_resource, int) else r
+            result = self.halving(n, r, max_resource)
+            if best is None or self.better(result[2], best[2]):
+                best = result
+        return best[:2]
+
+    def halving(self, n, min_resource, max_resource):
+        configs = [self.draw(max_resource) for _ in range(n)]
+        r = min_resource
+        while True:
+            scored = [(self.train(config, r), config) for config in configs]
+            scored.sort(key=lambda pair: pair[0][1], reverse=self.maximize)
+            keep = max(1, len(configs) // self.eta)
+            if r >= max_resource or keep == len(configs) == 1:
+                (leaf, value), config = scored[0]
+                return [dict(params) for params in config], leaf, value
+            configs = [config for _, config in scored[:keep]]
+            r = min(max_resource, r * self.eta)
+
+    def better(self, a, b):
+        return a > b if self.maximize else a < b
+
+    def draw(self, r):
+        """Draw the parameters of each step, without evaluating anything"""
+        rnd = self.rnd
+        if hasattr(rnd, "variant"):
+            rnd, self.drawn = rnd.variant(self.drawn), self.drawn + 1
+        current, config = self.start.clone(rnd=rnd) >> {self.resource: r}, []
+        for step in self.steps:
+            child = current >> step
+            config.append(drawn(current, child) if callable(step) or isinstance(step, AbstractLet) else {})
+            current = child
+        return config
+
+    def train(self, config, r):
+        current = self.start >> {self.resource: r}
+        for i, (step, params) in enumerate(zip(self.steps, config)):
+            current = self.apply(current, i, step, params)
+        value = current[self.score]
+        if self.log is not None:
+            self.log.append((r, [dict(params) for params in config], value))
+        return current, value
+
+    def apply(self, current, i, step, params):
+        """Apply a step with fixed parameter values, reusing the lazy fields of a previous identical application"""
+        if not (callable(step) or isinstance(step, AbstractLet)):
+            return current >> step
+        fields = inputs(step)
+        values = list(current.data.values()) if fields is None else [current.data.get(k) for k in fields]
+        key = i, tuple((k, token(v)) for k, v in params.items()), tuple(map(id, values))
+        if key in self.memo:
+            child = self.memo[key][1]
+            data = current.data.copy()
+            data.update((k, child.data[k]) for k in child.returned)
+            origins = current._origins.copy()
+            origins.update((k, child._origins[k]) for k in child.returned if k in child._origins)
+            return current.clone(data, _returned=child.returned, _origins=origins)
+        config = step.config if isinstance(step, AbstractLet) else {}
+        f = step.f if isinstance(step, AbstractLet) else step
+        child = current >> lLet(f, **{**config, **params})  # Drawn values replace the given lists.
+        if child.returned is not None:
+            # The input values are kept alive along with the child, so their ids are not reused.
+            self.memo[key] = values, child
+        return child
+
+
+def inputs(step):
+    """Names of the input fields of a step, or None when they are only known at application time"""
+    f = step.f if isinstance(step, AbstractLet) else step
+    try:
+        fields, _, _ = extract_input(f)
+        if hasattr(f, "metadata") and "dynamic" in f.metadata.get("input", {}):
+            return None
+        if "kwargs" in signature(f).parameters:
+            return None
+    except Exception:
+        return None
+    return list(fields)
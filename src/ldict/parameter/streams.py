@@ -0,0 +1,99 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from hashlib import blake2b
+from random import Random
+
+
+class Streams(Random):
+    """Order-independent parameter sampling: one NumPy random stream per (seed, step id, parameter name)
+
+    It is used in place of a 'Random' object. The value drawn for a parameter depends only on
+    the seed, the step ('function_id'), the parameter name and the variant number
+    (the position in the stream, see 'variant'). It does not depend on the order in which steps are
+    applied, nor on the thread or process applying them.
+    Draws are computed in vectorized blocks of 'block' positions, which are cached and shared by all variants.
+    The 'Random' methods (e.g., 'choice') are still available and are seeded with 'seed'.
+
+    >>> from ldict import ldict
+    >>> f = lambda x, a=[1, 2, 3, ..., 100]: {"y": x * a}
+    >>> g = lambda x, b=[1, 2, 3, ..., 100]: {"z": x + b}
+    >>> d1 = ldict(x=1) >> Streams(42) >> f >> g
+    >>> d2 = ldict(x=1) >> Streams(42) >> g >> f
+    >>> (d1.y, d1.z) == (d2.y, d2.z)
+    True
+    >>> rnd = Streams(42)
+    >>> [(ldict(x=1) >> rnd.variant(i) >> f).y for i in range(5)] == rnd.batch(f, "a", list(range(1, 101)), 5)
+    True
+    >>> import pickle
+    >>> (ldict(x=1) >> pickle.loads(pickle.dumps(rnd.variant(3))) >> f).y == rnd.batch(f, "a", range(1, 101), 5)[3]
+    True
+    """
+
+    block = 1024
+
+    def __new__(cls, *args, **kwargs):
+        return super().__new__(cls)
+
+    def __init__(self, seed=0, variant=0, _cache=None):
+        super().__init__(seed)
+        self.seed, self.index = seed, variant
+        self.cache = {} if _cache is None else _cache
+
+    def variant(self, i):
+        """Same streams, at position 'i'"""
+        return Streams(self.seed, i, self.cache)
+
+    def draw(self, step, name, seq):
+        """Value of 'seq' for the parameter 'name' of 'step' (a function or its id) in this variant"""
+        return self.batch(step, name, seq, 1)[0]
+
+    def batch(self, step, name, seq, n):
+        """Values of 'seq' for the parameter 'name' of 'step' in this variant and the next 'n' - 1"""
+        size = len(seq)
+        return [seq[int(u * size)] for u in self.uniforms(step, name, self.index, n)]
+
+    def uniforms(self, step, name, start, n):
+        from ldict.core.inspection import function_id
+
+        step = step if isinstance(step, str) else function_id(step)
+        first, last = start // self.block, (start + n - 1) // self.block
+        blocks = [self.uniform_block(step, name, b) for b in range(first, last + 1)]
+        offset = start - first * self.block
+        import numpy
+
+        return numpy.concatenate(blocks)[offset : offset + n].tolist()
+
+    def uniform_block(self, step, name, b):
+        key = step, name, b
+        if (block := self.cache.get(key)) is None:
+            from numpy.random import PCG64, Generator, SeedSequence
+
+            spawn_key = tuple(int.from_bytes(blake2b(s.encode(), digest_size=8).digest(), "big") for s in (step, name))
+            bitgen = PCG64(SeedSequence(self.seed, spawn_key=spawn_key))
+            # One 64-bit output per uniform: the stream can be jumped to any position.
+            bitgen.advance(b * self.block)
+            block = Generator(bitgen).random(self.block)
+            block = self.cache.setdefault(key, block)  # Atomic: concurrent variants keep the same block.
+        return block
+
+    def __reduce__(self):
+        return Streams, (self.seed, self.index)
@@ -0,0 +1,117 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from itertools import product
+
+from ldict.parameter.let import lLet
+
+
+class lSweep(lLet):
+    """
+    Apply a function once over all values of some of its parameters (cartesian product, in the given order)
+
+    Each output field is stacked: one leading axis per swept parameter, followed by the shape of a single result.
+    Lists, tuples, ranges (including A./G. progressions) and arrays are swept; other values are fixed as in 'let'.
+    Functions marked with 'metadata["broadcast"] = True' are called once: swept parameters are passed as arrays
+    shaped to broadcast against the input fields (one axis per parameter, then as many unit axes as the
+    input with most dimensions). Outputs with fewer axes than these arrays are taken as not depending on them
+    (reduce over input axes with 'keepdims=True') and are broadcast (as read-only views) over the sweep axes.
+    Unmarked functions are called once per combination of values.
+
+    >>> import numpy as np
+    >>> from ldict import ldict, sweep
+    >>> calls = []
+    >>> def f(x, y, a=[-1, 0, 1]):
+    ...     calls.append(a)
+    ...     return {"z": a * x + y}
+    >>> d = ldict(x=np.arange(3), y=1) >> sweep(f, a=[-100, -99, -98, ..., 100])
+    >>> d.z.shape, d.z[0], d.z[-1]
+    ((201, 3), array([   1,  -99, -199]), array([  1, 101, 201]))
+    >>> len(calls)
+    201
+    >>> f.metadata = {"broadcast": True}
+    >>> calls.clear()
+    >>> e = ldict(x=np.arange(3), y=1) >> sweep(f, a=[-100, -99, -98, ..., 100])
+    >>> (e.z == d.z).all(), len(calls)
+    (True, 1)
+    >>> g = lambda x, a=1, b=1: {"w": a * x + b, "s": x.sum()}
+    >>> e = ldict(x=np.arange(3)) >> sweep(g, a=[1, 2], b=np.array([0, 10, 20]))
+    >>> e.w.shape, e.w[1, 2], e.s.shape
+    ((2, 3, 3), array([20, 22, 24]), (2, 3))
+    """
+
+    def __init__(self, f, **kwargs):
+        from ldict.core.rshift import expand
+
+        config, self.swept = {}, []
+        for k, v in kwargs.items():
+            if isinstance(v, (list, tuple, range)) or hasattr(v, "__array__"):
+                import numpy
+
+                v = numpy.asarray(expand(v) if isinstance(v, list) else v)
+                self.swept.append(k)
+            config[k] = v
+        super().__init__(f, **config)
+
+    def function(self, f):
+        swept = self.swept
+        broadcast = getattr(f, "metadata", {}).get("broadcast", False)
+
+        def vectorized(**kwargs):
+            import numpy
+
+            grids = [kwargs[k] for k in swept]
+            shape = tuple(len(g) for g in grids)
+            if broadcast:
+                ndim = max((numpy.ndim(v) for k, v in kwargs.items() if k not in swept), default=0)
+                args = kwargs.copy()
+                for i, k in enumerate(swept):
+                    axes = tuple(len(g) if j == i else 1 for j, g in enumerate(grids))
+                    args[k] = grids[i].reshape(axes + (1,) * ndim)
+                ret = f(**args)
+                return {k: broadcast_to(v, shape, ndim) for k, v in ret.items()}
+            rets = []
+            for values in product(*grids):
+                args = kwargs.copy()
+                args.update(zip(swept, values))
+                rets.append(f(**args))
+            return {k: numpy.stack([r[k] for r in rets]).reshape(shape + numpy.shape(rets[0][k])) for k in rets[0]}
+
+        vectorized.__wrapped__ = f
+        return vectorized
+
+
+def broadcast_to(v, shape, ndim):
+    """Broadcast the result of a broadcast call to the full sweep shape
+
+    A result with the axes of the swept parameters (one per parameter, then 'ndim') has its leading axes
+    broadcast; any other result is the same for all combinations and gets the sweep axes prepended.
+
+    >>> import numpy as np
+    >>> broadcast_to(np.ones((3, 1)), (3,), 1).shape, broadcast_to(np.arange(3), (3,), 1).shape
+    ((3, 1), (3, 3))
+    """
+    import numpy
+
+    v = numpy.asarray(v)
+    if v.ndim < len(shape) + ndim:
+        return numpy.broadcast_to(v, shape + v.shape)
+    return numpy.broadcast_to(v, shape + v.shape[len(shape) :])
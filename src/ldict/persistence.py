@@ -0,0 +1,137 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+"""Directory store: one file per field plus a manifest, reopened as lazy fields"""
+import json
+import os
+import pickle
+from contextlib import contextmanager
+
+from ldict.core.base import AbstractLazyDict
+from ldict.lazyval import LazyVal
+
+MANIFEST = "manifest.json"
+
+
+def save(d, path):
+    """Write each field of the ldict 'd' to its own file inside the directory 'path'
+
+    NumPy arrays are stored as '.npy', nested ldicts as subdirectories, and other values are pickled.
+    Lazy fields are evaluated. Saving over a store removes its manifest first and writes the manifest last, so
+    an interrupted save is not mistaken for a store; files are replaced (not overwritten), so values read from
+    the old store, e.g., memory-mapped arrays, are not affected.
+
+    >>> from tempfile import mkdtemp
+    >>> from numpy import arange
+    >>> from ldict import ldict
+    >>> path = mkdtemp()
+    >>> d = ldict(x=arange(5), s="text", n=ldict(a=1)) >> (lambda x: {"y": x * 2})
+    >>> save(d, path)
+    >>> e = load(path)
+    >>> e
+    {
+        "x": "→(path)",
+        "s": "→(path)",
+        "n": "→(path)",
+        "y": "→(path)"
+    }
+    >>> e.y
+    memmap([0, 2, 4, 6, 8])
+    >>> e.n.a, e.s
+    (1, 'text')
+    >>> save(e >> (lambda y: {"y": y + 1}), path)  # Over the store it was read from.
+    >>> load(path).y, e.y
+    (memmap([1, 3, 5, 7, 9]), memmap([0, 2, 4, 6, 8]))
+    """
+    os.makedirs(path, exist_ok=True)
+    try:
+        os.remove(os.path.join(path, MANIFEST))
+    except FileNotFoundError:
+        pass
+    fields = []
+    for i, k in enumerate(d):
+        v = d[k]
+        if isinstance(v, AbstractLazyDict):
+            file, kind = str(i), "ldict"
+            save(v, os.path.join(path, file))
+        elif is_array(v):
+            file, kind = f"{i}.npy", "npy"
+            import numpy
+
+            with replacing(os.path.join(path, file)) as fd:
+                numpy.save(fd, v, allow_pickle=False)
+        else:
+            file, kind = f"{i}.pickle", "pickle"
+            with replacing(os.path.join(path, file)) as fd:
+                pickle.dump(v, fd, protocol=5)
+        fields.append({"name": k, "file": file, "kind": kind})
+    with replacing(os.path.join(path, MANIFEST)) as fd:
+        fd.write(json.dumps({"fields": fields}, indent=4).encode())
+
+
+@contextmanager
+def replacing(file):
+    """Binary file object writing to a temporary name, renamed to 'file' when done"""
+    tmp = f"{file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as fd:
+            yield fd
+        os.replace(tmp, file)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load(path):
+    """Open a store written by 'save' as a FrozenLazyDict; only the manifest is read
+
+    Each field is read on first access: arrays are memory-mapped read-only, other values are unpickled."""
+    from ldict.frozenlazydict import FrozenLazyDict
+
+    with open(os.path.join(path, MANIFEST)) as fd:
+        manifest = json.load(fd)
+    data = {}
+    for field in manifest["fields"]:
+        file = os.path.join(path, field["file"])
+        data[field["name"]] = LazyVal(field["name"], loaders[field["kind"]], {"path": file}, {}, None)
+    return FrozenLazyDict(data)
+
+
+def is_array(v):
+    try:
+        from numpy import ndarray
+    except ImportError:  # pragma: no cover
+        return False
+    return isinstance(v, ndarray) and not v.dtype.hasobject
+
+
+def load_npy(path):
+    import numpy
+
+    return numpy.load(path, mmap_mode="r")
+
+
+def load_pickle(path):
+    with open(path, "rb") as fd:
+        return pickle.load(fd)
+
+
+loaders = {"npy": load_npy, "pickle": load_pickle, "ldict": load}
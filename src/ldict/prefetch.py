@@ -0,0 +1,101 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+from weakref import finalize, ref
+
+
+class Prefetcher:
+    """Start computing lazy values in background threads as soon as they are created
+
+    Applied to an ldict ('d >> Prefetcher()'), it is kept by the ldicts derived from it, and each function
+    applied afterwards is submitted right away. A function can also ask for it: 'f.metadata["prefetch"] = True'
+    (a shared default prefetcher) or a 'Prefetcher' object.
+    Reading a field being computed waits for it; reading a field still queued computes it as usual.
+    At most 'depth' functions are queued or running: further ones are left lazy.
+    Queued work is dropped when its lazy values are not referenced anymore (e.g., the ldicts were collected).
+
+    >>> from ldict import ldict
+    >>> calls = []
+    >>> def f(x):
+    ...     calls.append(x)
+    ...     return {"y": x + 1}
+    >>> prefetcher = Prefetcher()
+    >>> d = ldict(x=1) >> prefetcher >> f
+    >>> prefetcher.shutdown()  # Wait for the submitted work.
+    >>> calls  # Computed before being read.
+    [1]
+    >>> d.y, calls
+    (2, [1])
+    """
+
+    _default = None
+
+    def __init__(self, workers=None, depth=32):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="ldict-prefetch")
+        self.depth = depth
+        self.slots = BoundedSemaphore(depth)
+
+    @classmethod
+    def default(cls):
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    @classmethod
+    def of(cls, f):
+        """Prefetcher requested by a function (through 'metadata["prefetch"]'), if any"""
+        prefetch = getattr(f, "metadata", {}).get("prefetch")
+        return cls.default() if prefetch is True else prefetch or None
+
+    def submit(self, lazies):
+        """Compute the (sibling) lazy values in the background, unless 'depth' is reached"""
+        lazies = list(lazies)
+        if not lazies or not self.slots.acquire(blocking=False):
+            return None
+        refs = [ref(lazy) for lazy in lazies]
+        future = self.executor.submit(run, refs)
+        future.add_done_callback(lambda _: self.slots.release())
+        # Only weak references are queued: cancel when all siblings are gone.
+        alive = [len(lazies)]
+
+        def gone():
+            alive[0] -= 1
+            if alive[0] == 0:
+                future.cancel()
+
+        for lazy in lazies:
+            finalize(lazy, gone)
+        return future
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+def run(refs):
+    for r in refs:
+        if (lazy := r()) is not None:
+            try:
+                lazy()
+            except Exception:  # Raised again when the field is read.
+                pass
+            return
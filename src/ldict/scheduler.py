@@ -0,0 +1,189 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from concurrent.futures import ThreadPoolExecutor
+from heapq import heappop, heappush
+from threading import Condition
+from time import perf_counter
+
+from ldict.core.dag import closure, costs, pending, step_metadata, step_name
+from ldict.core.inspection import function_id
+
+
+class Scheduler:
+    """Evaluate the lazy values of many ldicts in threads, under per-tag concurrency limits and a memory budget
+
+    Steps declare what they use in their metadata: 'resources' (a list of tags, e.g., ["blas"]) and 'memory'
+    (an estimate in bytes; otherwise, the size of the arrays it returned last time is used).
+    'limits' maps tags to how many steps holding them may run at once; 'memory' bounds the sum of estimates
+    of the running steps (a step larger than the budget runs alone).
+    Among the steps that are ready and fit, those heading the longest remaining chain (critical path,
+    according to 'metadata["cost"]' or the durations recorded by previous evaluations) start first.
+    'stats' holds, per function id, its name, number of runs, and total seconds waiting while ready and running.
+
+    >>> from time import sleep
+    >>> from ldict import ldict
+    >>> running, peak = [0], [0]
+    >>> def heavy(x):
+    ...     running[0] += 1
+    ...     peak[0] = max(peak[0], running[0])
+    ...     sleep(0.05)
+    ...     running[0] -= 1
+    ...     return {"y": x * 2}
+    >>> heavy.metadata = {"resources": ["blas"]}
+    >>> light = lambda y: {"z": y + 1}
+    >>> ds = [ldict(x=i) >> heavy >> light for i in range(4)]
+    >>> scheduler = Scheduler(workers=4, limits={"blas": 1})
+    >>> scheduler.evaluate(ds)
+    >>> [d.z for d in ds], peak
+    ([1, 3, 5, 7], [1])
+    >>> stats = scheduler.stats[function_id(heavy)]
+    >>> stats["name"], stats["runs"], sorted(stats)
+    ('heavy', 4, ['name', 'run', 'runs', 'wait'])
+    >>> from random import Random
+    >>> f = lambda x, a=[1, 2, 3]: {"z": x * a}
+    >>> [v.z for v in ldict(x=2).sample(f, 3, rnd=Random(0), workers=scheduler)]
+    [4, 2]
+    >>> Scheduler(limits={"blas": 0}).evaluate([ldict(x=1) >> heavy])
+    Traceback (most recent call last):
+    ...
+    ValueError: Step 'heavy' needs resource 'blas', limited to 0.
+    """
+
+    def __init__(self, workers=4, limits=None, memory=None):
+        if workers < 1:
+            raise ValueError(f"At least one worker is needed, not {workers}.")
+        self.workers, self.limits, self.memory = workers, limits or {}, memory
+        self.stats, self.footprints = {}, {}
+
+    def evaluate(self, ldicts, fields=None, cancel=None):
+        """Evaluate 'fields' (default: all) of each ldict; a 'CancelToken' stops it (see 'ldict.cancel')"""
+        tasks = self.tasks([d.data[k] for d in ldicts for k in (d.data if fields is None else fields)])
+        for task in tasks:
+            for tag in task.tags:
+                if self.limits.get(tag, 1) < 1:
+                    raise ValueError(f"Step '{task.name}' needs resource '{tag}', limited to {self.limits[tag]}.")
+        ready, seq, cond = [], 0, Condition()
+        state = {"running": 0, "memory": 0, "left": len(tasks), "error": None}
+        usage = dict.fromkeys(self.limits, 0)
+
+        def fits(task):
+            if state["running"] >= self.workers:
+                return False
+            if any(usage[tag] >= self.limits[tag] for tag in task.tags if tag in self.limits):
+                return False
+            if self.memory is None or state["running"] == 0:
+                return True
+            return state["memory"] + task.memory <= self.memory
+
+        def release(task):
+            nonlocal seq
+            task.ready, seq = perf_counter(), seq + 1
+            heappush(ready, (-task.priority, seq, task))
+
+        def finish(task, start, end):
+            self.record(task, start, end)
+            state["left"] -= 1
+            for dependent in task.dependents:
+                dependent.waiting -= 1
+                if dependent.waiting == 0:
+                    release(dependent)
+
+        def run(task):
+            start, error = perf_counter(), None
+            try:
+                task.lazy(cancel)
+            except BaseException as e:
+                error = e
+            with cond:
+                state["running"] -= 1
+                state["memory"] -= task.memory
+                for tag in task.tags:
+                    if tag in usage:
+                        usage[tag] -= 1
+                state["error"] = state["error"] or error
+                finish(task, start, perf_counter())
+                cond.notify()
+
+        for task in tasks:
+            if task.waiting == 0:
+                release(task)
+        with ThreadPoolExecutor(self.workers) as executor, cond:
+            while state["left"] and not state["error"]:
+                skipped = []
+                while ready:
+                    entry = heappop(ready)
+                    task = entry[2]
+                    if task.lazy.result is not None:  # Computed elsewhere meanwhile.
+                        finish(task, now := perf_counter(), now)
+                    elif fits(task):
+                        state["running"] += 1
+                        state["memory"] += task.memory
+                        for tag in task.tags:
+                            if tag in usage:
+                                usage[tag] += 1
+                        executor.submit(run, task)
+                    else:
+                        skipped.append(entry)
+                for entry in skipped:
+                    heappush(ready, entry)
+                if state["left"] and state["running"]:
+                    cond.wait()
+            # Leaving the executor waits for the running steps.
+            while state["running"]:
+                cond.wait()
+        if state["error"] is not None:
+            raise state["error"]
+
+    def tasks(self, lazies):
+        """One task per group of sibling lazy values, in dependency order, with their critical path lengths"""
+        tasks, bygroup = [], {}
+        for lazy in closure(lazies):
+            key = id(lazy.deps)  # Siblings share their dependencies.
+            if (task := bygroup.get(key)) is None:
+                task = bygroup[key] = Task(lazy, self)
+                tasks.append(task)
+            for v in lazy.deps.values():
+                if pending(v) and (dep := bygroup[id(v.deps)]) is not task and task not in dep.dependents:
+                    dep.dependents.append(task)
+                    task.waiting += 1
+        for task in reversed(tasks):
+            task.priority = task.cost + max((t.priority for t in task.dependents), default=0)
+        return tasks
+
+    def record(self, task, start, end):
+        stats = self.stats.setdefault(task.fid, {"name": task.name, "runs": 0, "wait": 0.0, "run": 0.0})
+        stats["runs"] += 1
+        stats["wait"] += start - task.ready
+        stats["run"] += end - start
+        if end > start:  # Not computed elsewhere.
+            costs[task.fid] = end - start
+            self.footprints[task.fid] = sum(getattr(lazy.result, "nbytes", 0) for lazy in task.lazy.lazies or [task.lazy])
+
+
+class Task:
+    def __init__(self, lazy, scheduler):
+        self.lazy, self.dependents, self.waiting, self.ready, self.priority = lazy, [], 0, None, 0
+        metadata = step_metadata(lazy.f)
+        self.fid, self.name = function_id(lazy.f), step_name(lazy.f)
+        self.tags = metadata.get("resources", [])
+        self.memory = metadata.get("memory", scheduler.footprints.get(self.fid, 0))
+        self.cost = metadata.get("cost", costs.get(self.fid, 0))
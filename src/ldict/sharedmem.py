@@ -0,0 +1,295 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+"""Zero-copy transport of array fields between processes through shared memory segments
+
+Segments are owned by the process that creates them and are reference counted there:
+every owner-side array holds one reference, and every ldict returned by 'share' holds one more until 'release'.
+A segment is unlinked when its count drops to zero, or at exit.
+Receiving processes map segments read-only and do not register them for cleanup.
+"""
+import atexit
+import mmap
+import os
+import weakref
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+
+from numpy import ndarray, shares_memory
+from pandas import DataFrame, Series
+
+from ldict.core.base import AbstractLazyDict
+
+
+class SharedArray(ndarray):
+    """NumPy array stored in a shared memory segment; it is pickled as a handle to the segment
+
+    Arrays derived from it are pickled as handles only when their memory lies inside the segment.
+
+    >>> import pickle
+    >>> from numpy import arange
+    >>> a = SharedArray.create(arange(1000))
+    >>> dump = pickle.dumps(a[10:20])
+    >>> len(dump) < 300
+    True
+    >>> b = pickle.loads(dump)
+    >>> b
+    SharedArray([10, 11, 12, 13, 14, 15, 16, 17, 18, 19])
+    >>> b.flags.writeable
+    False
+    >>> pickle.loads(pickle.dumps(a.sum())), pickle.loads(pickle.dumps(a * 2))[:3]
+    (499500, array([0, 2, 4]))
+    """
+
+    segment = None
+
+    def __array_finalize__(self, obj):
+        segment = getattr(obj, "segment", None)
+        self.segment = segment if segment is not None and offset(self, segment) is not None else None
+
+    def __array_wrap__(self, obj, *args, **kwargs):
+        obj = super().__array_wrap__(obj, *args, **kwargs)
+        if isinstance(obj, SharedArray) and obj.segment is None:
+            # New allocations (e.g., results of arithmetic) are ordinary arrays.
+            obj = obj.view(ndarray)
+            return obj[()] if obj.ndim == 0 else obj
+        return obj
+
+    @classmethod
+    def create(cls, array):
+        """Copy 'array' into a new shared memory segment owned by this process"""
+        segment = SharedMemory(create=True, size=max(array.nbytes, 1))
+        registry[segment.name] = [segment, 1]
+        shared = ndarray(array.shape, array.dtype, buffer=segment.buf).view(cls)
+        shared[...] = array
+        shared.segment = Handle(segment.name, segment.buf)
+        weakref.finalize(shared, decref, segment.name)
+        return shared
+
+    def __reduce_ex__(self, protocol):
+        if self.segment is None or (start := offset(self, self.segment)) is None:
+            return self.view(ndarray).__reduce_ex__(protocol)
+        return attach, (self.segment.name, self.shape, self.dtype.str, start, self.strides)
+
+
+class Handle:
+    """Name and mapped memory of a segment"""
+
+    def __init__(self, name, buf, mapping=None):
+        self.name, self.buf, self.mapping = name, buf, mapping
+        base = ndarray((len(buf),), "u1", buffer=buf)
+        self.start = base.__array_interface__["data"][0]
+        self.size = len(buf)
+
+
+def offset(array, segment):
+    """Position of the array memory inside the segment, or None if it lies (even partially) elsewhere"""
+    if array.size == 0:
+        return None
+    start = array.__array_interface__["data"][0] - segment.start
+    low = start + sum(s * (n - 1) for s, n in zip(array.strides, array.shape) if s < 0)
+    high = start + sum(s * (n - 1) for s, n in zip(array.strides, array.shape) if s > 0) + array.itemsize
+    return start if 0 <= low and high <= segment.size else None
+
+
+registry = {}
+"""Owned segments: name -> [SharedMemory, reference count]"""
+
+
+def incref(name):
+    if name in registry:
+        registry[name][1] += 1
+
+
+def decref(name):
+    if name in registry:
+        registry[name][1] -= 1
+        if registry[name][1] == 0:
+            segment = registry.pop(name)[0]
+            segment.unlink()
+            try:
+                segment.close()
+            except BufferError:  # pragma: no cover
+                pass  # The mapping is freed with its last view.
+
+
+@atexit.register
+def cleanup():
+    for segment, _ in registry.values():
+        try:
+            segment.unlink()
+        except FileNotFoundError:  # pragma: no cover
+            pass
+    registry.clear()
+
+
+def attach(name, shape, dtype, start, strides):
+    """Map (read-only) an array stored in an existing shared memory segment
+
+    The segment is not registered for cleanup in this process: the owner unlinks it."""
+    if name in registry:  # Sent back to the owner.
+        segment = registry[name][0]
+        handle = Handle(name, segment.buf)
+    elif os.name == "posix":
+        # Opened as 'SharedMemory' does, but read-only and without registering it with the resource tracker,
+        # which would unlink it when this process exits (before Python 3.13, even if it was only attached).
+        import _posixshmem
+
+        fd = _posixshmem.shm_open("/" + name.lstrip("/"), os.O_RDONLY, mode=0o600)
+        try:
+            mapping = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        handle = Handle(name, memoryview(mapping), mapping)
+    else:  # pragma: no cover
+        # Windows: the segment lives while a process has it open; there is no tracker.
+        segment = SharedMemory(name=name)
+        handle = Handle(name, segment.buf, segment)
+    array = ndarray(shape, dtype, buffer=handle.buf, offset=start, strides=strides).view(SharedArray)
+    array.segment = handle
+    array.flags.writeable = False
+    return array
+
+
+class SharedFrame(DataFrame):
+    """DataFrame backed by a SharedArray; derived frames are ordinary DataFrames"""
+
+    _metadata = ["shared"]
+
+    @property
+    def _constructor(self):
+        return DataFrame
+
+    def __reduce__(self):
+        if backed(self, self.shared):
+            return frame, (self.shared, self.index, self.columns)
+        return DataFrame(self).__reduce__()  # pragma: no cover
+
+
+class SharedSeries(Series):
+    """Series backed by a SharedArray; derived series are ordinary Series"""
+
+    _metadata = ["shared", "name"]
+
+    @property
+    def _constructor(self):
+        return Series
+
+    def __reduce__(self):
+        if backed(self, self.shared):
+            return frame, (self.shared, self.index, None, self.name)
+        return Series(self).__reduce__()  # pragma: no cover
+
+
+def backed(obj, shared):
+    """Whether the pandas object still holds exactly the data of the shared array"""
+    dtypes = [obj.dtype] if isinstance(obj, Series) else set(obj.dtypes)
+    return len(dtypes) == 1 and obj.shape == shared.shape and shares_memory(obj.values, shared)
+
+
+def frame(values, index, columns, name=None):
+    """Build a pandas object around a (shared) array without copying"""
+    if columns is None:
+        obj = SharedSeries(values, index=index, name=name, copy=False)
+    else:
+        obj = SharedFrame(values, index=index, columns=columns, copy=False)
+    obj.shared = values
+    return obj
+
+
+def share(d, threshold=1 << 20):
+    """Clone of the ldict 'd' with evaluated array fields larger than 'threshold' bytes placed in shared memory
+
+    Pickling the result (e.g., to send it to a worker of a multiprocessing pool) carries only segment handles.
+    Lazy fields are left untouched (their dependencies are pickled as usual), so share evaluated values
+    before applying functions to them. Series and single-dtype DataFrames are rebuilt around the shared array.
+    The segments are kept alive until 'release' is called on the result (see also 'shared').
+
+    >>> import pickle
+    >>> from numpy import ones
+    >>> from ldict import ldict
+    >>> d = ldict(x=ones(1_000_000), df=DataFrame(ones((100_000, 2)), columns=["a", "b"]), z=5)
+    >>> s = share(d, threshold=1000) >> (lambda x: {"y": x.sum()})
+    >>> s.df.shape
+    (100000, 2)
+    >>> len(pickle.dumps(s)) < 10_000
+    True
+    >>> s2 = pickle.loads(pickle.dumps(s))
+    >>> s2.y, s2.df.a.sum(), s2.z
+    (1000000.0, 100000.0, 5)
+    >>> release(s)
+    """
+    data = {}
+    for k, v in d.data.items():
+        if isinstance(v, AbstractLazyDict):
+            v = share(v, threshold)
+        elif isinstance(v, SharedArray):
+            if v.segment is not None:
+                incref(v.segment.name)
+        elif isinstance(v, (SharedFrame, SharedSeries)):
+            incref(v.shared.segment.name)
+        elif isinstance(v, ndarray):
+            if not v.dtype.hasobject and v.nbytes > threshold:
+                v = SharedArray.create(v)
+                incref(v.segment.name)
+        elif isinstance(v, (Series, DataFrame)):
+            dtypes = [v.dtype] if isinstance(v, Series) else set(v.dtypes)
+            if len(dtypes) == 1 and not dtypes.pop().hasobject and v.memory_usage(index=False).sum() > threshold:
+                values = SharedArray.create(v.to_numpy())
+                incref(values.segment.name)
+                if isinstance(v, Series):
+                    v = frame(values, v.index, None, v.name)
+                else:
+                    v = frame(values, v.index, v.columns)
+        data[k] = v
+    return d.clone(data)
+
+
+def release(d):
+    """Drop the references that 'share' took on the segments of the ldict 'd'"""
+    for v in d.data.values():
+        if isinstance(v, AbstractLazyDict):
+            release(v)
+        elif isinstance(v, SharedArray) and v.segment is not None:
+            decref(v.segment.name)
+        elif isinstance(v, (SharedFrame, SharedSeries)):
+            decref(v.shared.segment.name)
+
+
+@contextmanager
+def shared(d, threshold=1 << 20):
+    """Share 'd' during a 'with' block
+
+    >>> from numpy import arange
+    >>> from ldict import ldict
+    >>> with shared(ldict(x=arange(10)), threshold=0) as s:
+    ...     name = s.x.segment.name
+    ...     name in registry
+    True
+    >>> del s
+    >>> name in registry
+    False
+    """
+    s = share(d, threshold)
+    try:
+        yield s
+    finally:
+        release(s)
@@ -0,0 +1,89 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from inspect import signature
+
+from ldict.core.inspection import (
+    extract_body,
+    extract_dictstr,
+    extract_dynamic_input,
+    extract_input,
+    extract_returnstr,
+    function_id,
+    output_spec,
+)
+from ldict.exception import BadOutput, DependenceException
+
+
+def step(f=None, /, *, code=False, id=False, **metadata):
+    """Decorator filling 'f.metadata' with its input and output, read once from the signature and code
+
+    Applying a decorated function does not inspect it anymore: no decompilation, regexes or 'signature()'.
+    'code=True' stores the code text (used by '_code' and '"code": ...'); 'id=True' stores a stable id
+    ('function_id'), or give the id as a string. Other keyword arguments are added to the metadata.
+
+    >>> from ldict import ldict, let
+    >>> @step
+    ... def f(x, y, a=[1, 2, 3, ..., 9], target="z"):
+    ...     return {target: x * y + a, "w": x, "_history": ...}
+    >>> f.metadata["input"]["fields"], f.metadata["input"]["parameters"]
+    (['x', 'y'], {'a': [1, 2, 3, Ellipsis, 9], 'target': 'z'})
+    >>> f.metadata["output"]
+    {'fields': ['w'], 'meta': [], 'auto': ['_history'], 'dynamic': ['target']}
+    >>> d = ldict(x=2, y=3) >> let(f, a=1, target="v")
+    >>> d.v, d.w, list(d)
+    (7, 2, ['x', 'y', 'w', 'v', '_history'])
+    >>> @step(id=True, code=True, name="g")
+    ... def g(x):
+    ...     return {"y": x + 1, "_code": ...}
+    >>> g.metadata["id"] == function_id(g), g.metadata["name"]
+    (True, 'g')
+    >>> (ldict(x=1) >> g)._code == g.metadata["code"]
+    True
+    >>> @step
+    ... def h(x, target="y"):
+    ...     return {target: x, "z": kwargs[missing]}
+    Traceback (most recent call last):
+    ...
+    ldict.exception.DependenceException: ('Parameter providing a field name is missing', 'missing')
+    """
+    if f is None:
+        return lambda f: step(f, code=code, id=id, **metadata)
+    body = extract_body(f)
+    bodystr = "".join(body)
+    fields, parameters, optional = extract_input(f)
+    dynamic_input = extract_dynamic_input(bodystr)
+    returnstr = extract_returnstr(bodystr)
+    explicit, meta, auto, dynamic_output = output_spec(extract_dictstr(returnstr))
+    for par in dynamic_input + dynamic_output:
+        if par not in parameters:
+            raise DependenceException("Parameter providing a field name is missing", par)
+    if not explicit and not dynamic_output:
+        raise BadOutput("Could not find output fields that are valid identifiers (or kwargs[...]):", returnstr)
+    inp = {"fields": list(fields), "parameters": parameters, "optional": optional, "dynamic": dynamic_input}
+    out = {"fields": explicit, "meta": meta, "auto": auto, "dynamic": dynamic_output}
+    metadata = {**getattr(f, "metadata", {}), **metadata, "input": inp, "output": out}
+    if code:
+        metadata["code"] = f"def f{signature(f)}:\n" + "\n".join(body)
+    if id:
+        metadata["id"] = function_id(f) if id is True else id
+    f.metadata = metadata
+    return f
@@ -0,0 +1,192 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+"""Worker process evaluating steps sent by a 'Cluster' ('ldict.cluster')
+
+Run with: python -m ldict.worker [--host HOST] [--port PORT] [--allow-remote]
+It prints "listening HOST:PORT" once it accepts connections (port 0 picks a free one).
+
+Security: messages are dill dumps, and loading one runs arbitrary code: whoever can send messages to a worker
+can run anything as the user running it. A worker binds to loopback addresses only, unless '--allow-remote'
+is given, and each connection must first prove that it knows the secret in the environment variable
+LDICT_SECRET (required with '--allow-remote'; the coordinator reads the same variable): the worker sends a
+random challenge and expects its HMAC-SHA256 under the secret before loading anything.
+
+Protocol: after the handshake, each message is an 8-byte big-endian length followed by a dill dump of a tuple.
+  coordinator -> worker: ("steps", {key: dump of a function}), then ("tasks", [(task id, key, kwargs), ...])
+  worker -> coordinator: ("results", [(task id, success, return value or exception), ...])
+Functions are cached by key for the lifetime of the worker, so each one is sent once per worker.
+"""
+import hmac
+import ipaddress
+import os
+import socket
+import socketserver
+import struct
+import sys
+from argparse import ArgumentParser
+from hashlib import sha256
+
+HEADER = struct.Struct(">Q")
+CHALLENGE = 32
+
+
+def secret():
+    """Shared secret of workers and coordinators (environment variable LDICT_SECRET), as bytes"""
+    return os.environ.get("LDICT_SECRET", "").encode()
+
+
+def challenge(sock, key):
+    """Worker side of the handshake: whether the peer knows the secret 'key'"""
+    nonce = os.urandom(CHALLENGE)
+    sock.sendall(nonce)
+    answer = read(sock, sha256().digest_size)
+    return answer is not None and hmac.compare_digest(answer, hmac.new(key, nonce, sha256).digest())
+
+
+def respond(sock, key):
+    """Coordinator side of the handshake"""
+    if (nonce := read(sock, CHALLENGE)) is None:
+        raise ConnectionError("Worker closed the connection during the handshake.")
+    sock.sendall(hmac.new(key, nonce, sha256).digest())
+
+
+def send(sock, message):
+    import dill
+
+    payload = dill.dumps(message, protocol=5)
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def receive(sock):
+    """Next message, or None if the connection was closed"""
+    import dill
+
+    header = read(sock, HEADER.size)
+    if header is None:
+        return None
+    payload = read(sock, HEADER.unpack(header)[0])
+    if payload is None:
+        raise ConnectionError("Connection closed in the middle of a message.")
+    return dill.loads(payload)
+
+
+def read(sock, n):
+    buffer = bytearray(n)
+    view, received = memoryview(buffer), 0
+    while received < n:
+        if (size := sock.recv_into(view[received:])) == 0:
+            if received == 0:
+                return None
+            raise ConnectionError("Connection closed in the middle of a message.")
+        received += size
+    return bytes(buffer)
+
+
+class Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        import dill
+
+        from ldict.lazyval import call
+
+        steps = self.server.steps
+        if not challenge(self.request, self.server.secret):
+            return
+        while (message := receive(self.request)) is not None:
+            kind, content = message
+            if kind == "steps":
+                for key, dump in content.items():
+                    if key not in steps:
+                        steps[key] = dill.loads(dump)
+            elif kind == "tasks":
+                results = []
+                for task, key, kwargs in content:
+                    try:
+                        results.append((task, True, call(steps[key], kwargs, None)))
+                    except Exception as e:
+                        results.append((task, False, e))
+                try:
+                    send(self.request, ("results", results))
+                except (OSError, ConnectionError):
+                    return
+                except Exception:  # Nothing was sent: serialization failed.
+                    try:
+                        send(self.request, ("results", portable(results)))
+                    except (OSError, ConnectionError):
+                        return
+
+
+def portable(results):
+    """Results that cannot be pickled are replaced by an error"""
+    import dill
+
+    checked = []
+    for task, ok, value in results:
+        try:
+            dill.dumps(value, protocol=5)
+            checked.append((task, ok, value))
+        except Exception as e:
+            checked.append((task, False, RuntimeError(f"Result of task {task} is not serializable: {e!r}")))
+    return checked
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, key=b""):
+        super().__init__(address, Handler)
+        self.steps, self.secret = {}, key
+
+
+def loopback(host):
+    """Whether 'host' names only the local machine"""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return all(ipaddress.ip_address(address.split("%")[0]).is_loopback for address in addresses)
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog="python -m ldict.worker", description="Evaluate ldict steps for a coordinator.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument(
+        "--allow-remote",
+        action="store_true",
+        help="bind to a non-loopback address; anyone knowing LDICT_SECRET can run code as this user",
+    )
+    args = parser.parse_args(argv)
+    key = secret()
+    if not loopback(args.host):
+        if not args.allow_remote:
+            parser.error(f"refusing to run steps (arbitrary code) from the network on {args.host}; see --allow-remote")
+        if not key:
+            parser.error("--allow-remote requires a secret in the environment variable LDICT_SECRET")
+    with Server((args.host, args.port), key) as server:
+        host, port = server.server_address[:2]
+        print(f"listening {host}:{port}", flush=True)
+        server.serve_forever()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main(sys.argv[1:])
@@ -0,0 +1,84 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+import os
+import warnings
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from ldict import ldict
+from ldict.checkpoint import Checkpoint
+
+
+class Model:
+    metadata = {
+        "input": {"fields": ["x"], "parameters": {}, "dynamic": []},
+        "output": {"fields": ["y"], "meta": [], "auto": [], "dynamic": []},
+    }
+
+    runs = []  # Kept out of the instances: their attributes identify the step.
+
+    def __init__(self, a):
+        self.a = a
+
+    def __call__(self, x):
+        type(self).runs.append(self.a)
+        return {"y": x * self.a}
+
+
+class Named(Model):
+    metadata = {**Model.metadata, "id": "named-model"}
+
+
+class Unserializable(Model):
+    def __init__(self, a):
+        super().__init__(a)
+        self.source = (i for i in range(3))
+
+
+class TestCheckpoint(TestCase):
+    def setUp(self):
+        self.path = mkdtemp()
+        Model.runs.clear()
+
+    def test_object_state(self):
+        self.assertEqual((ldict(x=1) >> Checkpoint(self.path) >> Model(2)).y, 2)
+        self.assertEqual((ldict(x=1) >> Checkpoint(self.path) >> Model(1000)).y, 1000)
+        self.assertEqual(Model.runs, [2, 1000])
+
+    def test_stale_entry_with_fixed_id(self):
+        self.assertEqual((ldict(x=1) >> Checkpoint(self.path) >> Named(2)).y, 2)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertEqual((ldict(x=1) >> Checkpoint(self.path) >> Named(1000)).y, 1000)
+        self.assertIn("changed", str(caught[0].message))
+        # The stale entry was replaced.
+        self.assertEqual((ldict(x=1) >> Checkpoint(self.path) >> Named(1000)).y, 1000)
+        self.assertEqual(Model.runs, [2, 1000])
+
+    def test_restore(self):
+        self.assertEqual((ldict(x=2) >> Checkpoint(self.path) >> Model(3)).y, 6)
+        self.assertEqual((ldict(x=2) >> Checkpoint(self.path) >> Model(3)).y, 6)
+        self.assertEqual(Model.runs, [3])
+
+    def test_unidentifiable_step(self):
+        self.assertEqual((ldict(x=1) >> Checkpoint(self.path) >> Unserializable(2)).y, 2)
+        self.assertEqual(os.listdir(self.path), [])
@@ -0,0 +1,112 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+import os
+import subprocess
+import sys
+from pathlib import Path
+from threading import Timer
+from time import sleep
+from unittest import TestCase
+
+import ldict as package
+from ldict import ldict
+from ldict.cluster import Cluster
+
+
+def start_worker(*args, secret="test secret"):
+    paths = [str(Path(package.__file__).parent.parent), str(Path(__file__).parent.parent)]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(paths + [os.environ.get("PYTHONPATH", "")]))
+    env["LDICT_SECRET"] = secret
+    process = subprocess.Popen(
+        [sys.executable, "-m", "ldict.worker", "--port", "0", *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+    )
+    if not (line := process.stdout.readline()):
+        return process, None
+    host, port = line.split()[1].split(":")
+    return process, (host, int(port))
+
+
+def double(x):
+    return {"y": x * 2}
+
+
+def shift(y, x):
+    return {"z": y + x, "w": y - x}
+
+
+def slow(z):
+    sleep(0.05)
+    return {"v": z + 1}
+
+
+class TestCluster(TestCase):
+    def setUp(self):
+        self.workers = [start_worker() for _ in range(2)]
+
+    def tearDown(self):
+        for process, _ in self.workers:
+            stop(process)
+
+    def test_evaluate(self):
+        ds = [ldict(x=i) >> double >> shift for i in range(100)]
+        with Cluster([address for _, address in self.workers], batch=8, secret="test secret") as cluster:
+            cluster.evaluate(ds)
+            self.assertEqual([(d.z, d.w) for d in ds], [(3 * i, i) for i in range(100)])
+            more = [ldict(x=i) >> double for i in range(10)]
+            cluster.evaluate(more)  # Same connections; functions already sent.
+        self.assertEqual([d.y for d in more], [2 * i for i in range(10)])
+        with self.assertRaises(ZeroDivisionError), Cluster([self.workers[0][1]], secret="test secret") as cluster:
+            cluster.evaluate([ldict(x=0) >> (lambda x: {"y": 1 / x})])
+
+    def test_lost_worker(self):
+        ds = [ldict(x=i) >> double >> shift >> slow for i in range(40)]
+        Timer(0.2, self.workers[0][0].kill).start()
+        with Cluster([address for _, address in self.workers], batch=2, secret="test secret") as cluster:
+            cluster.evaluate(ds)
+        self.assertEqual([d.v for d in ds], [3 * i + 1 for i in range(40)])
+
+    def test_wrong_secret(self):
+        with self.assertRaises(ConnectionError), Cluster([self.workers[0][1]], secret="guess") as cluster:
+            cluster.evaluate([ldict(x=1) >> double])
+
+    def test_remote(self):
+        process, address = start_worker("--host", "0.0.0.0")
+        stderr = process.stderr.read()
+        stop(process)
+        self.assertIsNone(address)
+        self.assertIn("--allow-remote", stderr)
+        process, address = start_worker("--host", "0.0.0.0", "--allow-remote", secret="")
+        stderr = process.stderr.read()
+        stop(process)
+        self.assertIsNone(address)
+        self.assertIn("LDICT_SECRET", stderr)
+
+
+def stop(process):
+    process.kill()
+    process.stdout.close()
+    process.stderr.close()
+    process.wait()
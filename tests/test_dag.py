@@ -0,0 +1,39 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from unittest import TestCase
+
+from ldict import ldict, step
+
+
+@step
+def inc(x):
+    return {"x": x + 1}
+
+
+class TestGraph(TestCase):
+    def test_long_chain(self):
+        d = ldict(x=0)
+        for _ in range(3000):
+            d = d >> inc
+        graph = d.graph()
+        self.assertEqual((graph.work, graph.span, len(graph.critical_path)), (3000, 3000, 3000))
+        self.assertEqual((graph.critical_path[0], graph.critical_path[-1]), ("x@2999", "x"))
@@ -0,0 +1,89 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from unittest import TestCase
+
+import pytest
+
+from ldict.fingerprint import unstable
+from ldict.frozenlazydict import FrozenLazyDict
+
+factor = 3
+
+
+def make(k):
+    return lambda x: {"y": x + k}
+
+
+def scaled(x):
+    return {"y": x * factor}
+
+
+class Model:
+    metadata = {
+        "input": {"fields": ["x"], "parameters": {}, "dynamic": []},
+        "output": {"fields": ["y"], "meta": [], "auto": [], "dynamic": []},
+    }
+
+    def __init__(self, a):
+        self.a = a
+
+    def __call__(self, x):
+        return {"y": x * self.a}
+
+
+class Locked(Model):
+    def __init__(self, a):
+        super().__init__(a)
+        self.source = (i for i in range(3))  # Not serializable.
+
+
+class TestFingerprint(TestCase):
+    def test_closure(self):
+        a, b = FrozenLazyDict(x=1) >> make(1), FrozenLazyDict(x=1) >> make(100)
+        self.assertNotEqual(a, b)
+        self.assertNotEqual(hash(a), hash(b))
+        self.assertEqual(a, FrozenLazyDict(x=1) >> make(1))
+        self.assertEqual((a.y, b.y), (2, 101))
+
+    def test_callable_object(self):
+        a, b = FrozenLazyDict(x=1) >> Model(2), FrozenLazyDict(x=1) >> Model(1000)
+        self.assertNotEqual(a, b)
+        self.assertEqual(a, FrozenLazyDict(x=1) >> Model(2))
+        self.assertEqual(hash(a), hash(FrozenLazyDict(x=1) >> Model(2)))
+
+    def test_global(self):
+        global factor
+        a = FrozenLazyDict(x=1) >> scaled
+        fp = a.fingerprint
+        factor = 4
+        try:
+            self.assertNotEqual((FrozenLazyDict(x=1) >> scaled).fingerprint, fp)
+        finally:
+            factor = 3
+
+    def test_unstable(self):
+        a, b = FrozenLazyDict(x=1) >> Locked(2), FrozenLazyDict(x=1) >> Locked(2)
+        self.assertTrue(unstable(a.fingerprint))
+        self.assertEqual(a, b)  # Compared by value.
+        self.assertNotEqual(a, FrozenLazyDict(x=1) >> Locked(3))
+        with pytest.raises(TypeError):
+            hash(a)
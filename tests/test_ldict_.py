@@ -19,6 +19,8 @@
 #  works or verbatim, obfuscated, compiled or rewritten versions of any
 #  part of this work is illegal and unethical regarding the effort and
 #  time spent here.
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
 from unittest import TestCase
 
 import pytest
@@ -176,3 +178,17 @@ class TestLdict(TestCase):
         #     d["d"]["x"] = 5
 
         # T = namedtuple("T", "hosh")
+
+    def test_concurrent_evaluation(self):
+        calls = []
+
+        def f(x):
+            calls.append(x)
+            sleep(0.05)
+            return {"y": x + 1, "z": x + 2}
+
+        d = ldict(x=1) >> f
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda k: d[k], ["y", "z"] * 4))
+        self.assertEqual([2, 3] * 4, results)
+        self.assertEqual([1], calls)
@@ -0,0 +1,43 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from unittest import TestCase
+
+import pytest
+
+from ldict.core.reactive import ReactiveLdict
+from ldict.exception import DependenceException
+
+
+class TestReactive(TestCase):
+    def test_delete_upstream_field(self):
+        d = ReactiveLdict(x=1, z=2) >> (lambda x: {"y": x + 1}) >> (lambda y, z: {"w": y * z})
+        with pytest.raises(DependenceException):
+            del d["x"]
+        self.assertEqual((list(d), d.w, len(d.log)), (["x", "z", "y", "w"], 4, 2))
+        d.delete_many(["x", "y", "w"])  # Along with all that depends on it: nothing is replayed.
+        self.assertEqual((list(d), d.log, d.invalidated), (["z"], [], []))
+
+    def test_delete_unread_field(self):
+        d = ReactiveLdict(x=1, z=2) >> (lambda x: {"y": x + 1})
+        del d["z"]
+        d["x"] = 3
+        self.assertEqual((list(d), d.y, d.invalidated), (["x", "y"], 4, ["y"]))
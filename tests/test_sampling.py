@@ -0,0 +1,48 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from random import Random
+from unittest import TestCase
+
+import pytest
+
+from ldict import ldict, let
+from ldict.scheduler import Scheduler
+
+
+def f(x, a=[1, 2, 3]):
+    return {"z": x / a}
+
+
+class TestSample(TestCase):
+    def test_no_variants(self):
+        self.assertEqual(ldict(x=1).sample(f, 0, rnd=Random(0)), [])
+
+    def test_let_with_list_parameters(self):
+        variants = ldict(x=12).sample(let(f, a=[4, 6]), 10, rnd=Random(0))
+        self.assertEqual(sorted(v.z for v in variants), [2, 3])
+
+    def test_failing_variant(self):
+        step = let(f, a=[0, 1])
+        with pytest.raises(ZeroDivisionError):
+            ldict(x=1).sample(step, 10, rnd=Random(0), workers=2)
+        with pytest.raises(ZeroDivisionError):
+            ldict(x=1).sample(step, 10, rnd=Random(0), workers=Scheduler(workers=2))
@@ -0,0 +1,45 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from unittest import TestCase
+
+import pytest
+
+from ldict import ldict
+from ldict.scheduler import Scheduler
+
+
+def f(x):
+    return {"y": x + 1}
+
+
+f.metadata = {"resources": ["gpu"]}
+
+
+class TestScheduler(TestCase):
+    def test_invalid_limits(self):
+        d = ldict(x=1) >> f
+        with pytest.raises(ValueError, match="'gpu'"):
+            Scheduler(limits={"gpu": 0}).evaluate([d])
+        with pytest.raises(ValueError):
+            Scheduler(workers=0)
+        Scheduler(limits={"gpu": 1, "blas": 0}).evaluate([d])  # Unused tags may be disabled.
+        self.assertEqual(d.y, 2)
@@ -0,0 +1,41 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from random import Random
+from unittest import TestCase
+
+from ldict import ldict, let
+from ldict.parameter.search import halving, hyperband
+
+
+def train(x, epochs, a=[1, 2, 3, ..., 9], b=0):
+    return {"score": x - abs(a - 5) * epochs + b}
+
+
+class TestSearch(TestCase):
+    def test_let_with_list_parameters(self):
+        step = let(train, a=[4, 5, 6], b=1)
+        log = []
+        parameters, leaf = halving(ldict(x=1), step, "epochs", "score", 3, 1, 9, rnd=Random(0), log=log)
+        self.assertEqual((parameters, leaf.score), ([{"a": 5, "b": 1}], 2))
+        self.assertTrue(all(params[0]["a"] in [4, 5, 6] for _, params, _ in log))
+        parameters, leaf = hyperband(ldict(x=1), step, "epochs", "score", 1, 9, rnd=Random(1))
+        self.assertEqual(leaf.score, 2)
@@ -0,0 +1,74 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+import gc
+import os
+import pickle
+import subprocess
+import sys
+from multiprocessing import get_context
+from pathlib import Path
+from multiprocessing.shared_memory import SharedMemory
+from unittest import TestCase
+
+import pytest
+from numpy import arange
+
+import ldict as package
+from ldict import ldict
+from ldict.sharedmem import share, SharedArray, release
+
+
+def work(d):
+    return d.x.sum(), d.x.flags.writeable, isinstance(d.x, SharedArray)
+
+
+class TestSharedMemory(TestCase):
+    def test_pool(self):
+        d = share(ldict(x=arange(1_000_000), y=1), threshold=0)
+        with get_context("spawn").Pool(2) as pool:
+            results = pool.map(work, [d, d, d])
+        self.assertEqual([(499999500000, False, True)] * 3, results)
+
+    def test_refcount(self):
+        d = share(ldict(x=arange(10)), threshold=0)
+        name = d.x.segment.name
+        dump = pickle.dumps(d)
+        del d
+        gc.collect()
+        self.assertEqual(45, pickle.loads(dump).x.sum())  # 'share' still holds a reference.
+        release(pickle.loads(dump))  # Received back by the owner.
+        gc.collect()
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+
+    def test_attach_from_process(self):
+        d = share(ldict(x=arange(1000)), threshold=0)
+        name = d.x.segment.name
+        paths = [str(Path(package.__file__).parent.parent), str(Path(__file__).parent.parent)]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(paths + [os.environ.get("PYTHONPATH", "")]))
+        code = "import pickle, sys; x = pickle.load(sys.stdin.buffer).x; print(x.sum(), x.flags.writeable)"
+        child = subprocess.run(
+            [sys.executable, "-c", code], input=pickle.dumps(d), capture_output=True, env=env, check=True
+        )
+        self.assertEqual((b"499500 False", b""), (child.stdout.strip(), child.stderr))
+        SharedMemory(name=name).close()  # Still there after the child exited.
+        self.assertEqual(499500, d.x.sum())
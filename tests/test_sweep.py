@@ -0,0 +1,48 @@
+#  Copyright (c) 2021. Davi Pereira dos Santos
+#  This file is part of the ldict project.
+#  Please respect the license - more about this in the section (*) below.
+#
+#  ldict is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  ldict is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with ldict.  If not, see <http://www.gnu.org/licenses/>.
+#
+#  (*) Removing authorship by any means, e.g. by distribution of derived
+#  works or verbatim, obfuscated, compiled or rewritten versions of any
+#  part of this work is illegal and unethical regarding the effort and
+#  time spent here.
+from unittest import TestCase
+
+import numpy as np
+
+from ldict import ldict, sweep
+
+
+def f(x, a=1, b=1):
+    return {"y": a * x + b, "c": x + 0, "s": x.sum(), "m": (a * x).sum(axis=-1, keepdims=True)}
+
+
+def g(x, a=1, b=1):
+    return {"y": a * x + b, "c": x + 0, "s": x.sum(), "m": (a * x).sum(axis=-1, keepdims=True)}
+
+
+g.metadata = {"broadcast": True}
+
+
+class TestSweep(TestCase):
+    def test_broadcast_same_as_loop(self):
+        kwargs = {"a": [1, 2, 3], "b": np.array([0, 10, 20])}
+        d = ldict(x=np.arange(3)) >> sweep(f, **kwargs)
+        e = ldict(x=np.arange(3)) >> sweep(g, **kwargs)
+        for k in ["y", "c", "s", "m"]:
+            self.assertEqual(d[k].shape, e[k].shape)
+            self.assertTrue((d[k] == e[k]).all())
+        self.assertEqual((e.y.shape, e.c.shape, e.s.shape, e.m.shape), ((3, 3, 3), (3, 3, 3), (3, 3), (3, 3, 1)))